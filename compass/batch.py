@@ -0,0 +1,169 @@
+"""
+Tryb wsadowy - audyt wielu witryn w jednym procesie i jednej pętli zdarzeń
+"""
+import asyncio
+import os
+import re
+import time
+import urllib.parse
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from compass.config import (
+    REPORTS_BASE_DIR,
+    PERSIST_STATE,
+    STREAM_RESULTS,
+    RESULTS_FILE,
+    BATCH_CONCURRENCY,
+    BATCH_SITE_CONCURRENCY,
+    BATCH_MAX_SITES,
+)
+from compass.crawler import crawl, CrawlState, HttpCache, ResultSink
+from compass.crawler.parse_pool import ParsePool
+from compass.reports import save_reports
+from compass.utils import create_session
+
+
+def load_sites(path: str) -> List[str]:
+    """
+    Wczytuje listę witryn do audytu (jeden URL w linii, # - komentarz).
+
+    Args:
+        path: Ścieżka do pliku z listą URL-i
+
+    Returns:
+        Lista URL-i startowych (bez duplikatów, w kolejności z pliku)
+    """
+    sites = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            url = line.split("#", 1)[0].strip()
+            if not url:
+                continue
+            if "://" not in url:
+                url = "https://" + url
+            if url not in sites:
+                sites.append(url)
+    return sites
+
+
+def get_batch_dir() -> str:
+    """Generuje katalog dla bieżącego audytu wsadowego."""
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    batch_dir = os.path.join(REPORTS_BASE_DIR, f"batch_{timestamp}")
+    os.makedirs(batch_dir, exist_ok=True)
+    return batch_dir
+
+
+def get_site_output_dir(batch_dir: str, start_url: str) -> str:
+    """
+    Zwraca katalog raportów witryny w ramach audytu wsadowego.
+
+    Args:
+        batch_dir: Katalog audytu wsadowego
+        start_url: URL startowy witryny
+
+    Returns:
+        Ścieżka katalogu (np. raporty/batch_.../example.com)
+    """
+    parts = urllib.parse.urlsplit(start_url)
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", (parts.netloc + parts.path).strip("/")) or "site"
+    output_dir = os.path.join(batch_dir, name)
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
+
+
+async def audit_site(
+    start_url: str,
+    output_dir: str,
+    session: aiohttp.ClientSession,
+    pool: ParsePool,
+    limiter: asyncio.Semaphore,
+    cache: Optional[HttpCache] = None,
+) -> int:
+    """
+    Przeprowadza audyt jednej witryny przy użyciu współdzielonych zasobów
+    i zapisuje jej raporty.
+
+    Args:
+        start_url: URL startowy witryny
+        output_dir: Katalog wyjściowy raportów witryny
+        session: Wspólna sesja HTTP
+        pool: Wspólna pula parsowania
+        limiter: Globalny semafor pobrań stron
+        cache: Wspólny cache HTTP (opcjonalnie)
+
+    Returns:
+        Liczba przetworzonych stron
+    """
+    state = None
+    if PERSIST_STATE:
+        run_id = f"{os.path.basename(os.path.dirname(output_dir))}_{os.path.basename(output_dir)}"
+        state = CrawlState.create(run_id, start_url, output_dir)
+    sink = ResultSink(os.path.join(output_dir, RESULTS_FILE)) if STREAM_RESULTS else None
+    try:
+        data = await crawl(
+            start_url, state, cache, sink,
+            session=session,
+            pool=pool,
+            limiter=limiter,
+            concurrency=BATCH_SITE_CONCURRENCY,
+            progress=False,
+        )
+        # Raporty generujemy w wątku, żeby nie wstrzymywać crawlingu pozostałych witryn
+        await asyncio.to_thread(save_reports, data, start_url, output_dir)
+        if state:
+            state.finish()
+        return len(data)
+    finally:
+        if sink:
+            sink.close()
+        if state:
+            state.close()
+
+
+async def run_batch(start_urls: List[str], cache: Optional[HttpCache] = None) -> Dict[str, Optional[str]]:
+    """
+    Audytuje wiele witryn równolegle: jedna sesja HTTP (wspólna pula połączeń),
+    jedna pula parsowania, globalny limit równoczesnych pobrań
+    (`BATCH_CONCURRENCY`) i limit na witrynę (`BATCH_SITE_CONCURRENCY`).
+    Błąd jednej witryny nie przerywa audytu pozostałych.
+
+    Args:
+        start_urls: Lista URL-i startowych witryn
+        cache: Wspólny cache HTTP (opcjonalnie)
+
+    Returns:
+        Słownik URL startowy -> katalog raportów (None jeśli audyt się nie powiódł)
+    """
+    batch_dir = get_batch_dir()
+    print(f"📁 Katalog audytu wsadowego: {batch_dir}")
+    print(f"🌐 Witryn: {len(start_urls)}, limit pobrań: {BATCH_CONCURRENCY} "
+          f"(na witrynę: {BATCH_SITE_CONCURRENCY}), równolegle witryn: {BATCH_MAX_SITES}\n")
+
+    limiter = asyncio.Semaphore(BATCH_CONCURRENCY)
+    site_slots = asyncio.Semaphore(BATCH_MAX_SITES)
+    results: Dict[str, Optional[str]] = {}
+
+    async def run_site(start_url: str, session: aiohttp.ClientSession, pool: ParsePool):
+        async with site_slots:
+            output_dir = get_site_output_dir(batch_dir, start_url)
+            t0 = time.time()
+            try:
+                pages = await audit_site(start_url, output_dir, session, pool, limiter, cache)
+            except Exception as e:
+                print(f"❌ {start_url}: {e}")
+                results[start_url] = None
+                return
+            results[start_url] = output_dir
+            print(f"✅ {start_url}: {pages} stron, {time.time() - t0:.1f}s -> {output_dir}")
+
+    # Liczbę równoczesnych pobrań stron ogranicza semafor, więc pula połączeń nie ma
+    # osobnego limitu łącznego (zapytania o robots.txt i sitemapy nie czekają na strony)
+    async with create_session(limit=0) as session:
+        with ParsePool() as pool:
+            await asyncio.gather(*(run_site(url, session, pool) for url in start_urls))
+
+    return results
@@ -8,11 +8,92 @@ from datetime import datetime
 START_URL = "https://ekantor.pl/"
 MAX_PAGES = 300
 MAX_DEPTH = 3
-TIMEOUT = 25
 CONCURRENCY = 10
 USER_AGENT = "SiteAuditorBot/1.0 (+https://twojadomena.example/audyt)"
 RESPECT_ROBOTS = True
 
+# ===== ZBIÓR ODWIEDZONYCH URL-I =====
+# "exact" - 64-bitowe odciski URL-i w tablicy (dokładny, mało pamięci)
+# "bloom" - filtr Blooma (przybliżony, najmniej pamięci; ułamek nowych URL-i może zostać pominięty)
+# "set" - zwykły set() z pełnymi URL-ami
+SEEN_SET_MODE = "exact"
+BLOOM_CAPACITY = 1_000_000      # Pojemność pierwszej warstwy filtra Blooma
+BLOOM_ERROR_RATE = 0.001        # Dopuszczalny odsetek fałszywych trafień
+
+# ===== SITEMAP =====
+# URL-e z sitemap (Sitemap: w robots.txt lub /sitemap.xml) trafiają do kolejki
+# strumieniowo, równolegle z crawlingiem (indeksy sitemap i .xml.gz są obsługiwane)
+USE_SITEMAPS = True
+SITEMAP_CONCURRENCY = 4         # Liczba równolegle czytanych plików sitemap
+SITEMAP_QUEUE_SIZE = 1000       # Bufor wpisów między czytaniem sitemap a kolejką crawlera
+SITEMAP_MAX_FILES = 1000        # Maksymalna liczba plików sitemap (wraz z indeksami)
+SITEMAP_CHUNK_SIZE = 64 * 1024  # Rozmiar porcji czytanych z sieci (bajty)
+
+# ===== PRIORYTET KOLEJKI =====
+# Przy FRONTIER_PRIORITY = True budżet MAX_PAGES trafia najpierw do najważniejszych
+# stron: płytkich, często linkowanych, ważnych wg sitemap i z nowych typów URL-i
+# (szablonów, np. /produkt/*). Wynik URL-a rośnie z każdym nowym linkiem do niego.
+# False - kolejność wszerz (BFS), jak w kolejce FIFO.
+FRONTIER_PRIORITY = True
+PRIORITY_DEPTH_WEIGHT = 1.0     # Kara za każdy poziom głębokości
+PRIORITY_INLINK_WEIGHT = 1.0    # Premia za linki przychodzące (log(1 + liczba))
+PRIORITY_SITEMAP_WEIGHT = 1.0   # Premia za <priority> z sitemap (0.0-1.0)
+PRIORITY_LASTMOD_WEIGHT = 0.5   # Premia za świeży <lastmod> (maleje z wiekiem strony)
+PRIORITY_NOVELTY_WEIGHT = 2.0   # Premia za szablon URL-a, z którego nie pobrano jeszcze stron
+# Ile razy więcej URL-i z sitemap niż pozostały budżet może czekać w kolejce
+# (zapas, z którego wybierane są najważniejsze strony)
+FRONTIER_LOOKAHEAD = 4
+
+# ===== LIMITY DLA POJEDYNCZEGO HOSTA (POLITENESS) =====
+# CONCURRENCY to limit globalny; poniższe limity dotyczą każdego hosta osobno.
+# Crawl-delay / Request-rate z robots.txt dodatkowo zaostrzają te limity.
+PER_HOST_CONCURRENCY = CONCURRENCY
+PER_HOST_RATE = None            # Maks. zapytań na sekundę do hosta, np. 5.0 (None = bez limitu)
+PER_HOST_BURST = PER_HOST_CONCURRENCY
+BACKOFF_DEFAULT = 10            # Pauza (s) po 429/503 bez nagłówka Retry-After
+BACKOFF_MAX = 120               # Maksymalna pauza (s) po 429/503
+
+# ===== POŁĄCZENIA HTTP =====
+# Jedna pula połączeń (keep-alive, cache DNS) dla crawlera, robots.txt/sitemap i integracji
+CONNECT_TIMEOUT = 10            # Nawiązanie połączenia (TCP + TLS)
+READ_TIMEOUT = 20               # Maks. przerwa w odbieraniu danych
+TOTAL_TIMEOUT = 25              # Całe zapytanie o stronę (sitemapy czytane strumieniowo nie mają tego limitu)
+# Limity puli są wyższe niż liczba workerów, żeby strony nie czekały na połączenia
+# zajęte przez robots.txt i sitemapy (0 = bez limitu)
+CONNECTION_LIMIT = CONCURRENCY + SITEMAP_CONCURRENCY + 2
+CONNECTION_LIMIT_PER_HOST = PER_HOST_CONCURRENCY + SITEMAP_CONCURRENCY + 1
+DNS_CACHE_TTL = 300             # Czas (s) przechowywania wyników DNS
+KEEPALIVE_TIMEOUT = 30          # Czas (s) utrzymywania bezczynnego połączenia
+HTTP_COMPRESSION = True         # Accept-Encoding: br (jeśli zainstalowano brotli), gzip, deflate
+# Treść stron jest czytana strumieniowo: odpowiedzi inne niż HTML są przerywane
+# po nagłówkach, a strony większe niż MAX_HTML_SIZE - obcinane (i oznaczane w raporcie)
+MAX_HTML_SIZE = 5 * 1024 * 1024  # Bajty (0 = bez limitu)
+FETCH_CHUNK_SIZE = 64 * 1024    # Rozmiar porcji czytanych z sieci (bajty)
+# Kodowanie strony: BOM, charset z nagłówka Content-Type lub <meta charset> z początku dokumentu.
+# Strony bez deklaracji są czytane jako UTF-8, a gdy to niemożliwe - jako FALLBACK_ENCODING.
+ENCODING_SNIFF_BYTES = 2048
+FALLBACK_ENCODING = "cp1250"
+
+# ===== PARSOWANIE STRON =====
+# Parsowanie HTML i analizatory działają poza pętlą zdarzeń, żeby nie blokować pobierania.
+# "process" - pula procesów (wykorzystuje wszystkie rdzenie)
+# "thread" - pula wątków (fallback, gdy procesy są niedostępne)
+PARSE_EXECUTOR = "process"
+PARSE_WORKERS = os.cpu_count() or 1
+# Maksymalna liczba pobranych stron czekających na parsowanie (ogranicza zużycie pamięci)
+PARSE_QUEUE_SIZE = CONCURRENCY * 2
+
+# ===== TRYB WSADOWY (WIELE WITRYN) =====
+# python main.py --batch witryny.txt - wszystkie witryny w jednym procesie,
+# ze wspólną sesją HTTP i pulą parsowania
+BATCH_CONCURRENCY = 100             # Globalny limit równoczesnych pobrań stron
+BATCH_SITE_CONCURRENCY = CONCURRENCY  # Limit równoczesnych pobrań na witrynę
+BATCH_MAX_SITES = 50                # Maks. liczba witryn audytowanych jednocześnie
+
+# ===== PRZETWARZANIE URL-I =====
+# Rozmiar cache (LRU) znormalizowanych linków i decyzji "czy dodać do kolejki"
+URL_CACHE_SIZE = 50_000
+
 # ===== ZAKRES DOMENY =====
 # "root" - tylko ta sama domena (http://example.com)
 # "sub" - cała domena z subdomenami (*.example.com)
@@ -41,6 +122,32 @@ def get_output_dir() -> str:
     os.makedirs(output_dir, exist_ok=True)
     return output_dir
 
+# ===== STAN CRAWLINGU (WZNAWIANIE AUDYTÓW) =====
+# Stan audytu (kolejka, odwiedzone URL-e, wyniki) jest zapisywany w SQLite,
+# dzięki czemu przerwany audyt można wznowić: python main.py --resume <run-id>
+PERSIST_STATE = True
+STATE_DB_PATH = os.path.join(REPORTS_BASE_DIR, "crawl_state.db")
+STATE_FLUSH_EVERY = 200         # Zapis do bazy co N operacji...
+STATE_FLUSH_INTERVAL = 5.0      # ...lub co N sekund
+
+# ===== CACHE HTTP (AUDYTY PRZYROSTOWE) =====
+# Strony z ETag/Last-Modified są zapisywane w cache; w trybie przyrostowym
+# (INCREMENTAL lub python main.py --incremental) crawler wysyła zapytania
+# warunkowe i przy odpowiedzi 304 używa wyniku z poprzedniego audytu.
+HTTP_CACHE = True
+HTTP_CACHE_PATH = os.path.join(REPORTS_BASE_DIR, "http_cache.db")
+INCREMENTAL = False
+# Przy 304 parsuje ponownie zapisaną treść zamiast używać zapisanego wyniku
+# (przydatne po zmianach w analizatorach)
+CACHE_REPARSE = False
+
+# ===== WYNIKI STRON =====
+# Wynik każdej strony jest od razu dopisywany do pliku JSONL w katalogu
+# raportu i nie jest trzymany w pamięci - zużycie pamięci nie zależy od MAX_PAGES.
+STREAM_RESULTS = True
+RESULTS_FILE = "strony.jsonl"
+RESULTS_COMPRESS = True         # Kompresja gzip (strony.jsonl.gz)
+
 # ===== WYKLUCZENIA =====
 EXCLUDED_PATTERNS = [
     r'/polityka[_-]prywatnosci',
@@ -88,6 +195,12 @@ SYSTEM_PAGE_PATTERNS = [
     r'/404',
 ]
 
+# ===== WZORCE PER WITRYNA =====
+# Plik <host>.json (host bez www.) w tym katalogu uzupełnia powyższe listy
+# dla jednej witryny, np. {"excluded": ["/archiwum"], "system": ["/panel"]}.
+# Z kluczem "replace": true zastępuje listy domyślne.
+SITE_PATTERNS_DIR = "wzorce"
+
 # ===== OPCJE RAPORTOWANIA =====
 SHOW_REMEDIATIONS = False
 
@@ -2,5 +2,8 @@
 Moduł crawlera stron internetowych
 """
 from .crawler import crawl
+from .state import CrawlState
+from .http_cache import HttpCache
+from .sink import ResultSink, PageStream
 
-__all__ = ['crawl']
+__all__ = ['crawl', 'CrawlState', 'HttpCache', 'ResultSink', 'PageStream']
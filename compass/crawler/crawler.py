@@ -2,9 +2,9 @@
 Główny moduł crawlera - asynchroniczne przeszukiwanie witryny
 """
 import asyncio
+import contextlib
 import aiohttp
-from collections import deque
-from typing import Dict, Any, Set
+from typing import Dict, Any, List, Tuple, Optional
 
 try:
     from tqdm import tqdm
@@ -19,123 +19,322 @@ from compass.config import (
     RESPECT_ROBOTS,
     USER_AGENT,
     USE_PAGESPEED,
+    PARSE_QUEUE_SIZE,
+    CACHE_REPARSE,
+    USE_SITEMAPS,
 )
-from compass.utils import same_site, is_excluded_url, should_skip_url, normalize_url_for_analysis
-from compass.analyzers import analyze_security_headers
+from compass.utils import create_session, absolutize, crawl_candidate
 from compass.integrations import check_pagespeed
-from .fetcher import fetch, parse_page
-from .robots import build_robots, discover_sitemaps, fetch_and_parse_sitemaps
+from .fetcher import fetch, is_html_content_type
+from .frontier import Frontier
+from .http_cache import HttpCache
+from .parse_pool import ParsePool
+from .politeness import robots_interval
+from .robots import RobotsCache, discover_sitemaps, stream_sitemaps
+from .state import CrawlState
+from .seen import make_seen_set
+from .sink import ResultSink
 
 
-async def crawl(start_url: str) -> Dict[str, Any]:
+async def crawl(
+    start_url: str,
+    state: Optional[CrawlState] = None,
+    cache: Optional[HttpCache] = None,
+    sink: Optional[ResultSink] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    pool: Optional[ParsePool] = None,
+    limiter: Optional[asyncio.Semaphore] = None,
+    concurrency: int = CONCURRENCY,
+    progress: bool = True,
+) -> Dict[str, Any]:
     """
     Przeszukuje witrynę internetową asynchronicznie, analizując wszystkie strony.
 
     Args:
         start_url: URL startowy do przeszukania
+        state: Trwały stan audytu (opcjonalnie) - jeśli zawiera zapisane dane,
+            crawling jest wznawiany od miejsca przerwania
+        cache: Cache HTTP (opcjonalnie) - zapisuje strony i, w trybie
+            przyrostowym, pozwala pominąć strony bez zmian (HTTP 304)
+        sink: Plik JSONL na wyniki (opcjonalnie) - każda przetworzona strona
+            jest od razu zapisywana na dysk i nie jest trzymana w pamięci
+        session: Wspólna sesja HTTP (opcjonalnie, np. w trybie wsadowym);
+            domyślnie crawler tworzy i zamyka własną sesję
+        pool: Wspólna pula parsowania (opcjonalnie); domyślnie własna pula
+        limiter: Semafor ograniczający liczbę równoczesnych pobrań stron,
+            współdzielony przez kilka crawli (globalny budżet połączeń)
+        concurrency: Liczba workerów pobierających strony tej witryny
+        progress: Czy wyświetlać pasek postępu
 
     Returns:
-        Słownik z wynikami crawlingu (URL -> dane strony)
+        Słownik z wynikami crawlingu (URL -> dane strony) lub, gdy podano
+        `sink`, strumień wyników czytany z pliku (`PageStream`)
     """
-    # Kolejka URL-i do odwiedzenia: (url, depth)
-    q = deque([(start_url, 0)])
-    seen: Set[str] = {start_url}
+    seen = make_seen_set()
     results: Dict[str, Any] = {}
+    done = 0
+
+    def store(url: str, item: Dict[str, Any]):
+        """Zapisuje wynik strony w pliku JSONL lub w pamięci."""
+        nonlocal done
+        done += 1
+        if sink:
+            sink.write(item)
+        else:
+            results[url] = item
+
+    pending: List[Tuple[str, int]] = []
+    if state:
+        pending = state.pending()
+        seen.update(state.iter_seen())
+        # Wyniki sprzed przerwania trafiają ponownie do pliku wynikowego
+        for url, item in state.iter_results():
+            store(url, item)
+        if done:
+            print(f"♻️  Wznawianie audytu: {done} stron gotowych, {len(pending)} w kolejce")
+
+    # Kolejka URL-i do odwiedzenia: (url, depth) - strony już przetworzone wliczają się do budżetu
+    frontier = Frontier(MAX_PAGES)
+    frontier.claimed = done
+
+    def add_url(url: str, depth: int, inlinks: int = 0, priority: Optional[float] = None, lastmod: Optional[str] = None):
+        """Oznacza URL jako odwiedzony i dodaje go do kolejki."""
+        seen.add(url)
+        if frontier.push(url, depth, inlinks, priority, lastmod) and state:
+            state.add_url(url, depth)
+
+    for url, depth in pending:
+        frontier.push(url, depth)
+    if start_url not in seen:
+        add_url(start_url, 0)
 
     # Pasek postępu (jeśli dostępny tqdm)
-    pbar = tqdm(total=MAX_PAGES, desc="Crawling", unit="page") if HAS_TQDM else None
-
-    async with aiohttp.ClientSession() as session:
-        # Budowanie parsera robots.txt
-        rp = await build_robots(session, start_url) if RESPECT_ROBOTS else None
-
-        # Semaphore do kontroli współbieżności
-        sem = asyncio.Semaphore(CONCURRENCY)
-
-        # Odkrywanie i parsowanie sitemap.xml
-        '''
-        try:
-            sitemaps = await discover_sitemaps(session, start_url)
-            if sitemaps:
-                urls_from_sm = await fetch_and_parse_sitemaps(session, sitemaps)
-                for u in urls_from_sm[:max(0, MAX_PAGES - len(q))]:
-                    if u not in seen and same_site(start_url, u) and not is_excluded_url(u):
-                        seen.add(u)
-                        q.append((u, 1))
-        except Exception as e:
-            print(f"⚠️  Błąd przy pobieraniu sitemap: {e}")
-        '''
-        async def worker():
-            """Worker do przetwarzania URL-i z kolejki."""
-            while q and len(results) < MAX_PAGES:
-                url, depth = q.popleft()
-
-                # Sprawdzenie robots.txt
-                if RESPECT_ROBOTS and rp and not rp.can_fetch(USER_AGENT, url):
-                    results[url] = {"url": url, "error": "blocked_by_robots"}
-                    if pbar:
-                        pbar.update(1)
-                    continue
-
-                async with sem:
-                    # Pobranie strony
-                    status, final, ct, html, headers = await fetch(session, url)
-
-                    item: Dict[str, Any] = {
-                        "url": url,
-                        "final_url": final,
-                        "status": status,
-                        "content_type": ct,
-                        "headers": headers
-                    }
-
-                    # Obsługa błędów
-                    if not status or (isinstance(html, str) and html.startswith("__ERROR__")):
-                        item["error"] = html if isinstance(html, str) else "fetch_error"
-                        results[url] = item
-                        if pbar:
-                            pbar.update(1)
+    pbar = tqdm(total=MAX_PAGES, initial=done, desc="Crawling", unit="page") if HAS_TQDM and progress else None
+
+    # Statystyki transferu: pobrane bajty treści, odpowiedzi pominięte po nagłówkach, strony obcięte
+    traffic = {"bytes": 0, "skipped": 0, "truncated": 0}
+
+    # Bez wspólnego semafora limit pobrań wyznacza sama liczba workerów
+    limiter = limiter or asyncio.Semaphore(concurrency)
+
+    async with contextlib.nullcontext(session) if session else create_session() as session:
+        # Parsery robots.txt (osobno dla każdego hosta) - Crawl-delay/Request-rate
+        # zaostrzają limity hosta w harmonogramie frontiera
+        robots = RobotsCache(
+            session,
+            on_load=lambda host, rp: frontier.scheduler.configure(host, robots_interval(rp, USER_AGENT)),
+        )
+        start_rp = await robots.get(start_url) if RESPECT_ROBOTS else None
+
+        # Kolejka pobranych stron HTML czekających na parsowanie (ograniczona - backpressure)
+        parse_q: asyncio.Queue = asyncio.Queue(maxsize=PARSE_QUEUE_SIZE)
+
+        def finish(url: str, item: Dict[str, Any]):
+            """Zapisuje wynik strony i aktualizuje pasek postępu."""
+            store(url, item)
+            if state:
+                state.add_result(url, item)
+            if pbar:
+                pbar.update(1)
+
+        def enqueue_url(
+            link: str,
+            depth: int,
+            inlinks: int = 1,
+            priority: Optional[float] = None,
+            lastmod: Optional[str] = None,
+        ):
+            """
+            Dodaje URL do kolejki, jeśli jest wewnętrzny, nie wykluczony i nowy.
+            URL-owi, który już czeka w kolejce, aktualizowany jest priorytet.
+            """
+            # Zakres witryny, wykluczenia, pomijanie (#, ?, paginacja) i normalizacja
+            # w jednym przejściu, z pamięcią podręczną dla powtarzających się linków
+            normalized_link = crawl_candidate(start_url, link)
+            if normalized_link is None:
+                return
+            if normalized_link not in seen:
+                add_url(normalized_link, depth, inlinks, priority, lastmod)
+            else:
+                frontier.update(normalized_link, inlinks, priority, lastmod)
+
+        def enqueue_links(links, depth: int):
+            """Dodaje nowe linki wewnętrzne do kolejki."""
+            if depth + 1 > MAX_DEPTH:
+                return
+            # Kilka linków z jednej strony do tego samego URL-a liczy się jako jeden
+            for link in dict.fromkeys(links):
+                enqueue_url(link, depth + 1)
+
+        async def ingest_sitemaps():
+            """
+            Strumieniowo dodaje URL-e z sitemap do kolejki w trakcie crawlingu.
+            Czytanie jest wstrzymywane, gdy kolejka zawiera już tyle URL-i,
+            ile mieści się w budżecie stron.
+            """
+            try:
+                sitemaps = await discover_sitemaps(session, start_url, start_rp)
+                async for loc, lastmod, priority in stream_sitemaps(session, sitemaps):
+                    await frontier.wait_for_room()
+                    if frontier.closed:
+                        break
+                    enqueue_url(absolutize(start_url, loc), 1, 0, priority, lastmod)
+            except Exception as e:
+                print(f"⚠️  Błąd przy pobieraniu sitemap: {e}")
+            finally:
+                frontier.producer_done()
+
+
+        async def fetch_url(url: str) -> Tuple[Dict[str, Any], Optional[str]]:
+            """
+            Pobiera pojedynczy URL.
+
+            Returns:
+                Krotka: (dane strony, surowe bajty HTML do sparsowania lub None)
+            """
+            # Pobranie strony (w trybie przyrostowym - zapytanie warunkowe);
+            # treść odpowiedzi innych niż HTML nie jest pobierana, a HTML dekoduje dopiero parser
+            conditional = cache.conditional_headers(url) if cache else None
+            status, final, ct, html, headers, info = await fetch(
+                session, url, conditional, html_only=True, decode=False
+            )
+            traffic["bytes"] += info["bytes"]
+            traffic["skipped"] += info["skipped"]
+            traffic["truncated"] += info["truncated"]
+
+            # Strona bez zmian od poprzedniego audytu - używamy zapisanego wyniku
+            if status == 304 and conditional:
+                cached = cache.load(url)
+                if cached:
+                    cached_item, cached_html = cached
+                    cached_item["url"] = url
+                    cached_item["not_modified"] = True
+                    cached_item["bytes_received"] = 0
+                    if CACHE_REPARSE:
+                        keys = (
+                            "url", "final_url", "status", "content_type", "headers",
+                            "not_modified", "bytes_received", "encoding",
+                        )
+                        return {k: cached_item.get(k) for k in keys}, cached_html
+                    return cached_item, None
+
+            item: Dict[str, Any] = {
+                "url": url,
+                "final_url": final,
+                "status": status,
+                "content_type": ct,
+                "headers": headers,
+                "bytes_received": info["bytes"],
+            }
+            if info["truncated"]:
+                item["truncated"] = True
+
+            # Obsługa błędów
+            if not status or (isinstance(html, str) and html.startswith("__ERROR__")):
+                item["error"] = html if isinstance(html, str) else "fetch_error"
+                return item, None
+
+            if not is_html_content_type(ct):
+                item["note"] = "Pominięto (non-HTML)"
+                return item, None
+
+            # Kodowanie z nagłówka/BOM/<meta> (None = ustali je parser)
+            item["encoding"] = info["encoding"]
+            return item, html
+
+        async def fetch_worker():
+            """Worker pobierający URL-e z frontiera i przekazujący HTML do parsowania."""
+            while True:
+                url, depth = await frontier.get()
+                handed_off = False
+                released = False
+                try:
+                    # Sztywny limit MAX_PAGES - miejsce w budżecie rezerwujemy przed pobraniem
+                    if not frontier.claim():
                         continue
 
-                    # Parsowanie HTML
-                    if ct and "text/html" in ct:
-                        parsed = parse_page(html, final)
-                        item.update(parsed)
+                    # Sprawdzenie robots.txt
+                    if RESPECT_ROBOTS and not (await robots.get(url)).can_fetch(USER_AGENT, url):
+                        finish(url, {"url": url, "error": "blocked_by_robots"})
+                        continue
+
+                    try:
+                        async with limiter:
+                            item, html = await fetch_url(url)
+                    except Exception as e:
+                        # Pojedynczy błąd nie może zatrzymać całego crawlingu
+                        item, html = {"url": url, "error": f"__ERROR__:{e}"}, None
+                    frontier.release(url)
+                    released = True
 
-                        # Analiza bezpieczeństwa
-                        security_analysis = analyze_security_headers(headers, final, html)
-                        item["security"] = security_analysis
+                    # Host prosi o zwolnienie tempa
+                    if item.get("status") in (429, 503):
+                        frontier.backoff(url, item.get("headers", {}).get("Retry-After"))
+
+                    if html is None:
+                        if item.get("not_modified"):
+                            # Wynik z cache - linki strony nadal trafiają do kolejki
+                            enqueue_links(item.get("links", []), depth)
+                        finish(url, item)
+                        continue
+                    # URL pozostaje "in-flight" aż do zakończenia parsowania
+                    await parse_q.put((url, depth, item, html))
+                    handed_off = True
+                finally:
+                    if not released:
+                        # Zapytanie nie zostało wysłane - token wraca do puli hosta
+                        frontier.release(url, used=False)
+                    if not handed_off:
+                        frontier.task_done()
+
+        async def parse_worker():
+            """Worker parsujący strony w puli i dodający nowe linki do frontiera."""
+            while True:
+                url, depth, item, html = await parse_q.get()
+                try:
+                    try:
+                        item.update(await pool.parse(html, item["final_url"], item["headers"], item.get("encoding")))
 
                         # PageSpeed Insights (tylko dla pierwszych kilku stron)
-                        if USE_PAGESPEED and len(results) < 5:
-                            item["pagespeed"] = await check_pagespeed(final)
+                        if USE_PAGESPEED and done < 5:
+                            item["pagespeed"] = await check_pagespeed(item["final_url"], session)
+
+                        if cache:
+                            cache.store(url, html, item)
 
                         # Dodawanie nowych linków do kolejki
-                        for link in item.get("links", []):
-                            if not same_site(start_url, link):
-                                continue
-                            if is_excluded_url(link):
-                                continue
-                            # Pomijamy linki z fragmentami (#), parametrami (?) i paginacją
-                            if should_skip_url(link):
-                                continue
-                            # Normalizujemy URL do porównania (bez fragmentów i parametrów)
-                            normalized_link = normalize_url_for_analysis(link)
-                            if normalized_link not in seen and depth + 1 <= MAX_DEPTH:
-                                seen.add(normalized_link)
-                                q.append((normalized_link, depth + 1))
-                    else:
-                        item["note"] = "Pominięto (non-HTML)"
-
-                    results[url] = item
-                    if pbar:
-                        pbar.update(1)
-
-        # Uruchomienie workerów
-        tasks = [asyncio.create_task(worker()) for _ in range(CONCURRENCY)]
-        await asyncio.gather(*tasks)
+                        enqueue_links(item.get("links", []), depth)
+                    except Exception as e:
+                        item["error"] = f"__ERROR__:{e}"
+                    finish(url, item)
+                finally:
+                    parse_q.task_done()
+                    frontier.task_done()
+
+        with contextlib.nullcontext(pool) if pool else ParsePool() as pool:
+            # Uruchomienie workerów - czekają na URL-e, dopóki frontier nie zostanie opróżniony
+            tasks = [asyncio.create_task(fetch_worker()) for _ in range(concurrency)]
+            tasks += [asyncio.create_task(parse_worker()) for _ in range(pool.workers)]
+            if USE_SITEMAPS and MAX_DEPTH >= 1:
+                frontier.add_producer()
+                tasks.append(asyncio.create_task(ingest_sitemaps()))
+            try:
+                await frontier.join()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if state:
+                    state.flush()
+                if cache:
+                    cache.flush()
+                if sink:
+                    sink.flush()
 
     if pbar:
         pbar.close()
+    if progress:
+        print(f"📦 Pobrano {traffic['bytes'] / 1024 / 1024:.1f} MB treści stron; "
+              f"pominięto po nagłówkach (non-HTML): {traffic['skipped']}, obcięto: {traffic['truncated']}")
 
-    return results
+    return sink.pages() if sink else results
@@ -3,13 +3,13 @@ Moduł pobierania i parsowania stron HTML
 """
 import re
 import aiohttp
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, Tuple, Optional, Union
 from bs4 import BeautifulSoup
 import extruct
 from w3lib.html import get_base_url
 
-from compass.config import TIMEOUT, USER_AGENT
-from compass.utils import clean_text, absolutize, same_site, is_excluded_url, is_system_page
+from compass.config import USER_AGENT, MAX_HTML_SIZE, FETCH_CHUNK_SIZE, ENCODING_SNIFF_BYTES
+from compass.utils import clean_text, page_timeout, sniff_encoding, decode_html, absolutize, site_scope, is_excluded_url, is_system_page
 from compass.analyzers import (
     calculate_meta_score,
     extract_nap_signals,
@@ -63,38 +63,95 @@ def is_decorative_image(img_tag) -> bool:
     return False
 
 
-async def fetch(session: aiohttp.ClientSession, url: str) -> Tuple[Optional[int], str, str, str, Dict[str, str]]:
+def is_html_content_type(ct: Optional[str]) -> bool:
+    """Sprawdza, czy nagłówek Content-Type wskazuje na stronę HTML."""
+    return bool(ct) and "text/html" in ct.lower()
+
+
+async def fetch(
+    session: aiohttp.ClientSession,
+    url: str,
+    extra_headers: Optional[Dict[str, str]] = None,
+    html_only: bool = False,
+    max_size: int = MAX_HTML_SIZE,
+    decode: bool = True,
+) -> Tuple[Optional[int], str, str, Union[str, bytes], Dict[str, str], Dict[str, Any]]:
     """
     Pobiera zawartość strony przy użyciu aiohttp.
 
+    Treść jest czytana strumieniowo: w trybie `html_only` odpowiedź inna niż
+    HTML (PDF, wideo, ZIP...) jest przerywana zaraz po nagłówkach, a treść
+    dłuższa niż `max_size` bajtów jest obcinana.
+
     Args:
         session: Sesja aiohttp
         url: URL do pobrania
+        extra_headers: Dodatkowe nagłówki zapytania (np. If-None-Match)
+        html_only: Czy pomijać treść odpowiedzi innych niż HTML
+        max_size: Maksymalna liczba pobieranych bajtów treści (0 = bez limitu)
+        decode: Czy zwrócić tekst; przy False zwracane są surowe bajty, a kodowanie
+            (info["encoding"]) dekoduje dopiero parser - treść jest dekodowana raz
 
     Returns:
-        Krotka: (status_code, final_url, content_type, html, headers)
+        Krotka: (status_code, final_url, content_type, html, headers, info),
+        gdzie info to {"bytes": pobrane bajty treści, "truncated": czy obcięto,
+        "skipped": czy pominięto treść (non-HTML), "encoding": kodowanie
+        z nagłówka/BOM/<meta> lub None}
     """
+    request_headers = {"User-Agent": USER_AGENT}
+    if extra_headers:
+        request_headers.update(extra_headers)
+    info = {"bytes": 0, "truncated": False, "skipped": False, "encoding": None}
     try:
         async with session.get(
             url,
             allow_redirects=True,
-            timeout=TIMEOUT,
-            headers={"User-Agent": USER_AGENT}
+            timeout=page_timeout(),
+            headers=request_headers
         ) as r:
             ct = r.headers.get("Content-Type", "")
-            txt = await r.text(errors="ignore")
-            return r.status, str(r.url), ct, txt, {k: v for k, v in r.headers.items()}
+            headers = {k: v for k, v in r.headers.items()}
+            if html_only and r.status != 304 and not is_html_content_type(ct):
+                # Nie pobieramy treści - połączenie zostanie zamknięte bez czytania body
+                info["skipped"] = True
+                return r.status, str(r.url), ct, "", headers, info
+
+            chunks = []
+            size = 0
+            async for chunk in r.content.iter_chunked(FETCH_CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if max_size and size > max_size:
+                    info["truncated"] = True
+                    break
+            body = b"".join(chunks)
+            if info["truncated"]:
+                body = body[:max_size]
+            info["bytes"] = len(body)
+            info["encoding"] = sniff_encoding(body[:ENCODING_SNIFF_BYTES], ct)
+            if not decode:
+                return r.status, str(r.url), ct, body, headers, info
+            txt, info["encoding"] = decode_html(body, info["encoding"])
+            return r.status, str(r.url), ct, txt, headers, info
     except Exception as e:
-        return None, url, "", f"__ERROR__:{e}", {}
+        return None, url, "", f"__ERROR__:{e}", {}, info
 
 
-def parse_page(html: str, url: str) -> Dict[str, Any]:
+def parse_page(
+    html: str,
+    url: str,
+    raw: Optional[bytes] = None,
+    encoding: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Parsuje stronę HTML i wydobywa wszystkie istotne dane SEO/AEO/GEO.
 
     Args:
         html: Kod HTML strony
         url: URL strony
+        raw: Surowe bajty strony (opcjonalnie) - przekazywane do lxml
+            w extruct zamiast ponownego kodowania tekstu
+        encoding: Kodowanie surowych bajtów
 
     Returns:
         Słownik z wynikami analizy strony
@@ -147,6 +204,9 @@ def parse_page(html: str, url: str) -> Dict[str, Any]:
         for a in a_tags
         if not a["href"].startswith("javascript:")
     ]
+    # Każdy link sprawdzamy tylko raz - zewnętrzne to pozostałe
+    scope = site_scope(url)
+    internal_links = sum(1 for l in links if scope.contains(l))
 
     # Open Graph
     og_data = {}
@@ -166,16 +226,24 @@ def parse_page(html: str, url: str) -> Dict[str, Any]:
         if name and content:
             twitter_data[name] = content
 
-    # Structured Data (Schema.org) - używamy extruct dla pełnej ekstrakcji
-    try:
-        structured = extruct.extract(
-            html,
-            base_url=get_base_url(html, url),
-            syntaxes=["json-ld", "microdata", "rdfa"],  # Dodano RDFa
-            uniform=True
-        )
-    except Exception:
-        structured = {"json-ld": [], "microdata": [], "rdfa": []}
+    # Structured Data (Schema.org) - używamy extruct dla pełnej ekstrakcji.
+    # Surowe bajty lxml dekoduje sam; gdy nie zna kodowania - parsujemy tekst
+    sources = [(html, "UTF-8")]
+    if raw is not None and encoding:
+        sources.insert(0, (raw, "utf-8" if encoding == "utf-8-sig" else encoding))
+    structured = {"json-ld": [], "microdata": [], "rdfa": []}
+    for source, source_encoding in sources:
+        try:
+            structured = extruct.extract(
+                source,
+                base_url=get_base_url(source, url, source_encoding),
+                encoding=source_encoding,
+                syntaxes=["json-ld", "microdata", "rdfa"],  # Dodano RDFa
+                uniform=True
+            )
+            break
+        except Exception:
+            continue
 
     # Wyodrębnianie typów z JSON-LD (w tym z @graph)
     jsonld_types = []
@@ -292,8 +360,8 @@ def parse_page(html: str, url: str) -> Dict[str, Any]:
         "text_len": text_len,
         "word_count": len(text.split()),
         "links": links,
-        "internal_links": len([l for l in links if same_site(url, l)]),
-        "external_links": len([l for l in links if not same_site(url, l)]),
+        "internal_links": internal_links,
+        "external_links": len(links) - internal_links,
         "nap_signals": nap_signals,
         "eeat_signals": eeat_signals,
         "geo_signals": geo_signals,
@@ -301,3 +369,30 @@ def parse_page(html: str, url: str) -> Dict[str, Any]:
         "is_excluded": is_excluded_url(url),
         "is_system_page": is_system,  # Strona systemowa (cart, login, account)
     }
+
+
+def analyze_page(
+    html: Union[str, bytes],
+    url: str,
+    headers: Dict[str, str],
+    encoding: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Pełna analiza pobranej strony HTML: parsowanie oraz analiza bezpieczeństwa.
+    Funkcja nie korzysta ze stanu crawlera, więc może działać w puli procesów.
+
+    Args:
+        html: Kod HTML strony - tekst lub surowe bajty (dekodowane tu, jeden raz)
+        url: Końcowy URL strony (po przekierowaniach)
+        headers: Nagłówki odpowiedzi HTTP
+        encoding: Kodowanie bajtów ustalone przy pobieraniu (opcjonalnie)
+
+    Returns:
+        Słownik z wynikami analizy strony (wraz z kluczami "security" i "encoding")
+    """
+    raw = html if isinstance(html, bytes) else None
+    html, encoding = decode_html(html, encoding)
+    result = parse_page(html, url, raw, encoding)
+    result["security"] = analyze_security_headers(headers, url, html)
+    result["encoding"] = encoding
+    return result
@@ -0,0 +1,366 @@
+"""
+Kolejka URL-i do odwiedzenia (frontier) z obsługą budżetu stron i priorytetów
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import urllib.parse
+from collections import Counter, deque
+from datetime import date
+from typing import Deque, Dict, List, Optional, Tuple
+
+from compass.config import (
+    FRONTIER_PRIORITY,
+    FRONTIER_LOOKAHEAD,
+    PRIORITY_DEPTH_WEIGHT,
+    PRIORITY_INLINK_WEIGHT,
+    PRIORITY_SITEMAP_WEIGHT,
+    PRIORITY_LASTMOD_WEIGHT,
+    PRIORITY_NOVELTY_WEIGHT,
+)
+from compass.utils import url_template
+from .politeness import HostScheduler
+
+
+def host_of(url: str) -> str:
+    """Zwraca host (netloc) URL-a używany jako klucz limitów per host."""
+    return urllib.parse.urlsplit(url).netloc.lower()
+
+
+def lastmod_age(lastmod: Optional[str]) -> Optional[int]:
+    """
+    Zwraca wiek strony w dniach na podstawie <lastmod> z sitemap.
+
+    Args:
+        lastmod: Data w formacie W3C (np. 2024-01-31 lub 2024-01-31T10:00:00+01:00)
+
+    Returns:
+        Liczba dni od modyfikacji lub None, jeśli daty nie da się odczytać
+    """
+    if not lastmod:
+        return None
+    try:
+        modified = date.fromisoformat(lastmod.strip()[:10])
+    except ValueError:
+        return None
+    return max(0, (date.today() - modified).days)
+
+
+class _Candidate:
+    """URL oczekujący w kolejce wraz z sygnałami do wyliczenia priorytetu."""
+
+    __slots__ = ("url", "depth", "inlinks", "priority", "age", "template", "seq")
+
+    def __init__(self, url: str, depth: int):
+        self.url = url
+        self.depth = depth
+        self.inlinks = 0
+        self.priority: Optional[float] = None
+        self.age: Optional[int] = None
+        self.template = url_template(url)
+        self.seq = 0
+
+
+class Frontier:
+    """
+    Asynchroniczna kolejka URL-i do odwiedzenia.
+
+    W odróżnieniu od zwykłego `deque` workery czekają na nowe URL-e zamiast
+    kończyć pracę, gdy kolejka jest chwilowo pusta (np. podczas pobierania
+    strony startowej). Frontier śledzi URL-e w trakcie przetwarzania
+    (in-flight), pilnuje sztywnego limitu stron (`max_pages`) i pozwala
+    poczekać, aż cała praca zostanie wykonana (`join`).
+
+    URL-e są trzymane w osobnych kolejkach dla każdego hosta i wydawane
+    po kolei (round-robin) z tych hostów, na które pozwala `HostScheduler`.
+
+    Kolejka hosta jest kopcem: najpierw wydawany jest URL o najwyższym
+    priorytecie (głębokość, linki przychodzące, priority/lastmod z sitemap,
+    nowość szablonu URL-a). Zmiana sygnałów (`update`) dodaje nowy wpis do
+    kopca, a nieaktualne wpisy są pomijane przy zdejmowaniu. Przy równych
+    priorytetach (i przy FRONTIER_PRIORITY = False) zachowana jest kolejność FIFO.
+    """
+
+    def __init__(self, max_pages: int, scheduler: Optional[HostScheduler] = None):
+        """
+        Args:
+            max_pages: Maksymalna liczba stron, które mogą zostać przetworzone
+            scheduler: Limity per host (domyślnie wartości z konfiguracji)
+        """
+        self.max_pages = max_pages
+        self.scheduler = scheduler or HostScheduler()
+        self.claimed = 0
+        self.in_flight = 0
+        self._hosts: Dict[str, List[Tuple[float, int, str]]] = {}
+        self._ring: Deque[str] = deque()
+        self._pending: Dict[str, _Candidate] = {}
+        self._templates: Counter = Counter()
+        self._seq = itertools.count()
+        self._stale = 0
+        self._unfinished = 0
+        self._closed = False
+        self._wakeup = asyncio.Event()
+        self._room = asyncio.Event()
+        self._all_done = asyncio.Event()
+        self._all_done.set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def budget_left(self) -> int:
+        """Liczba stron, które jeszcze mieszczą się w budżecie."""
+        return max(0, self.max_pages - self.claimed)
+
+    @property
+    def closed(self) -> bool:
+        """True jeśli frontier nie przyjmuje już nowych URL-i."""
+        return self._closed
+
+    def push(
+        self,
+        url: str,
+        depth: int,
+        inlinks: int = 0,
+        priority: Optional[float] = None,
+        lastmod: Optional[str] = None,
+    ) -> bool:
+        """
+        Dodaje URL do kolejki.
+
+        Args:
+            url: URL do odwiedzenia
+            depth: Głębokość URL-a względem strony startowej
+            inlinks: Liczba znanych linków prowadzących do URL-a
+            priority: <priority> z sitemap (opcjonalnie)
+            lastmod: <lastmod> z sitemap (opcjonalnie)
+
+        Returns:
+            True jeśli URL został dodany (False gdy frontier jest zamknięty)
+        """
+        if self._closed:
+            return False
+        if url in self._pending:
+            self.update(url, inlinks, priority, lastmod)
+            return True
+        candidate = self._pending[url] = _Candidate(url, depth)
+        candidate.inlinks = inlinks
+        candidate.priority = priority
+        candidate.age = lastmod_age(lastmod)
+        host = host_of(url)
+        if host not in self._hosts:
+            self._hosts[host] = []
+            self._ring.append(host)
+        self._enqueue(host, candidate)
+        self._unfinished += 1
+        self._all_done.clear()
+        self._wakeup.set()
+        return True
+
+    def update(
+        self,
+        url: str,
+        inlinks: int = 0,
+        priority: Optional[float] = None,
+        lastmod: Optional[str] = None,
+    ) -> bool:
+        """
+        Aktualizuje sygnały URL-a czekającego w kolejce (np. nowy link przychodzący).
+
+        Args:
+            url: URL w kolejce
+            inlinks: Liczba nowych linków prowadzących do URL-a
+            priority: <priority> z sitemap (opcjonalnie)
+            lastmod: <lastmod> z sitemap (opcjonalnie)
+
+        Returns:
+            True jeśli URL czekał w kolejce
+        """
+        candidate = self._pending.get(url)
+        if candidate is None:
+            return False
+        candidate.inlinks += inlinks
+        if priority is not None:
+            candidate.priority = priority
+        if lastmod is not None:
+            candidate.age = lastmod_age(lastmod)
+        if FRONTIER_PRIORITY:
+            # Poprzedni wpis w kopcu staje się nieaktualny
+            self._stale += 1
+            self._enqueue(host_of(url), candidate)
+            if self._stale > 2 * len(self._pending) + 1000:
+                self._compact()
+        return True
+
+    def score(self, candidate: _Candidate) -> float:
+        """
+        Wylicza priorytet URL-a (wyższy = pobierany wcześniej).
+
+        Args:
+            candidate: URL z kolejki wraz z sygnałami
+
+        Returns:
+            Priorytet (0 przy FRONTIER_PRIORITY = False)
+        """
+        if not FRONTIER_PRIORITY:
+            return 0.0
+        score = PRIORITY_NOVELTY_WEIGHT / (1 + self._templates[candidate.template])
+        score -= PRIORITY_DEPTH_WEIGHT * candidate.depth
+        score += PRIORITY_INLINK_WEIGHT * math.log1p(candidate.inlinks)
+        if candidate.priority is not None:
+            score += PRIORITY_SITEMAP_WEIGHT * candidate.priority
+        if candidate.age is not None:
+            score += PRIORITY_LASTMOD_WEIGHT / (1 + candidate.age / 30)
+        return score
+
+    def _enqueue(self, host: str, candidate: _Candidate):
+        candidate.seq = next(self._seq)
+        heapq.heappush(self._hosts[host], (-self.score(candidate), candidate.seq, candidate.url))
+
+    def _compact(self):
+        """Usuwa z kopców nieaktualne wpisy."""
+        for host, heap in self._hosts.items():
+            heap[:] = [e for e in heap if self._pending.get(e[2]) and self._pending[e[2]].seq == e[1]]
+            heapq.heapify(heap)
+        self._stale = 0
+
+    def _pop_host(self, host: str) -> Tuple[str, int]:
+        """
+        Zdejmuje z kopca hosta URL o najwyższym priorytecie.
+
+        Nowość szablonu maleje, gdy pobierane są kolejne strony tego samego typu,
+        więc priorytet zdejmowanego URL-a jest liczony ponownie - jeśli spadł
+        poniżej następnego w kolejce, URL wraca do kopca z nowym wynikiem.
+        """
+        heap = self._hosts[host]
+        while True:
+            neg_score, seq, url = heapq.heappop(heap)
+            candidate = self._pending.get(url)
+            if candidate is None or candidate.seq != seq:
+                self._stale = max(0, self._stale - 1)
+                continue
+            current = -self.score(candidate)
+            if current > neg_score and heap and current > heap[0][0]:
+                candidate.seq = next(self._seq)
+                heapq.heappush(heap, (current, candidate.seq, url))
+                continue
+            del self._pending[url]
+            self._templates[candidate.template] += 1
+            return url, candidate.depth
+
+    def _has_pending(self, host: str) -> bool:
+        heap = self._hosts[host]
+        while heap:
+            neg_score, seq, url = heap[0]
+            candidate = self._pending.get(url)
+            if candidate is not None and candidate.seq == seq:
+                return True
+            heapq.heappop(heap)
+            self._stale = max(0, self._stale - 1)
+        return False
+
+    async def get(self) -> Tuple[str, int]:
+        """
+        Czeka na kolejny URL, który można pobrać bez przekraczania limitów hosta,
+        i oznacza go jako przetwarzany. Po przetworzeniu należy wywołać
+        `release()` (po pobraniu) oraz `task_done()`.
+
+        Returns:
+            Krotka: (url, depth)
+        """
+        while True:
+            item, wait = self._pop_ready()
+            if item is not None:
+                self.in_flight += 1
+                self._room.set()
+                return item
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, url: str, used: bool = True):
+        """
+        Zwalnia połączenie do hosta zarezerwowane przez `get()`.
+
+        Args:
+            url: URL zwrócony przez `get()`
+            used: False jeśli zapytanie do hosta nie zostało wysłane
+        """
+        self.scheduler.release(host_of(url), used)
+        self._wakeup.set()
+
+    def backoff(self, url: str, retry_after: Optional[str] = None):
+        """Wstrzymuje zapytania do hosta URL-a (po odpowiedzi 429/503)."""
+        self.scheduler.backoff(host_of(url), retry_after)
+
+    def add_producer(self):
+        """
+        Rejestruje zewnętrzne źródło URL-i (np. czytnik sitemap).
+        Dopóki źródło nie wywoła `producer_done()`, `join()` nie zakończy się,
+        nawet jeśli kolejka jest chwilowo pusta.
+        """
+        self._unfinished += 1
+        self._all_done.clear()
+
+    def producer_done(self):
+        """Oznacza zewnętrzne źródło URL-i jako zakończone."""
+        self._finish(1)
+
+    async def wait_for_room(self):
+        """
+        Czeka, aż w kolejce będzie mniej URL-i niż FRONTIER_LOOKAHEAD razy
+        pozostały budżet stron (lub frontier zostanie zamknięty). Pozwala
+        źródłom URL-i nie zapełniać pamięci adresami, które i tak nie zmieszczą
+        się w budżecie, zostawiając zapas do wyboru najważniejszych stron.
+        """
+        lookahead = FRONTIER_LOOKAHEAD if FRONTIER_PRIORITY else 1
+        while not self._closed and len(self._pending) >= self.budget_left * lookahead:
+            self._room.clear()
+            await self._room.wait()
+
+    def claim(self) -> bool:
+        """
+        Rezerwuje miejsce w budżecie stron dla pobranego URL-a.
+        Po wyczerpaniu budżetu frontier jest zamykany.
+
+        Returns:
+            True jeśli URL mieści się w budżecie i powinien zostać przetworzony
+        """
+        if self.claimed >= self.max_pages:
+            self.close()
+            return False
+        self.claimed += 1
+        if self.claimed >= self.max_pages:
+            self.close()
+        return True
+
+    def task_done(self):
+        """Oznacza URL pobrany przez `get()` jako przetworzony."""
+        self.in_flight -= 1
+        self._finish(1)
+
+    def _finish(self, count: int):
+        self._unfinished -= count
+        if self._unfinished <= 0:
+            self._all_done.set()
+
+    def close(self):
+        """
+        Zamyka frontier: odrzuca oczekujące URL-e i blokuje dodawanie nowych.
+        URL-e w trakcie przetwarzania mogą się normalnie zakończyć.
+        """
+        self._closed = True
+        dropped = len(self._pending)
+        self._hosts.clear()
+        self._ring.clear()
+        self._pending.clear()
+        self._stale = 0
+        self._room.set()
+        self._finish(dropped)
+
+    async def join(self):
+        """Czeka, aż kolejka będzie pusta i żaden URL nie będzie przetwarzany."""
+        await self._all_done.wait()
@@ -0,0 +1,135 @@
+"""
+Dyskowy cache HTTP dla audytów przyrostowych (ETag / Last-Modified)
+"""
+import os
+import json
+import sqlite3
+import zlib
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from compass.config import HTTP_CACHE_PATH, STATE_FLUSH_EVERY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS http_cache (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    result TEXT NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+"""
+
+
+class HttpCache:
+    """
+    Cache odpowiedzi HTTP zapisywany w SQLite, kluczowany URL-em.
+
+    Dla każdej strony HTML przechowuje walidatory (ETag, Last-Modified),
+    skompresowaną treść oraz wynik analizy. W trybie przyrostowym
+    (`conditional=True`) crawler wysyła `If-None-Match` / `If-Modified-Since`,
+    a przy odpowiedzi 304 używa zapisanego wyniku zamiast ponownie pobierać
+    i parsować stronę.
+    """
+
+    def __init__(self, path: str = HTTP_CACHE_PATH, conditional: bool = True):
+        """
+        Args:
+            path: Ścieżka do pliku bazy SQLite
+            conditional: Czy wysyłać zapytania warunkowe (tryb przyrostowy)
+        """
+        self.path = path
+        self.conditional = conditional
+        self.hits = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self._pending: List[Tuple[str, Optional[str], Optional[str], bytes, str, str]] = []
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Zwraca nagłówki zapytania warunkowego dla URL-a z cache.
+
+        Args:
+            url: URL strony
+
+        Returns:
+            Słownik nagłówków (pusty jeśli brak wpisu lub tryb nieprzyrostowy)
+        """
+        if not self.conditional:
+            return {}
+        row = self.conn.execute(
+            "SELECT etag, last_modified FROM http_cache WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return {}
+        etag, last_modified = row
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def load(self, url: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """
+        Zwraca zapisany wynik analizy i treść strony (po odpowiedzi 304).
+
+        Args:
+            url: URL strony
+
+        Returns:
+            Krotka: (wynik analizy, surowe bajty strony w kodowaniu
+            `wynik["encoding"]`) lub None jeśli brak wpisu
+        """
+        row = self.conn.execute("SELECT result, body FROM http_cache WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        result, body = row
+        return json.loads(result), zlib.decompress(body)
+
+    def store(self, url: str, html: Union[str, bytes], result: Dict[str, Any]):
+        """
+        Zapisuje stronę w cache (tylko jeśli serwer podał ETag lub Last-Modified).
+
+        Args:
+            url: URL strony
+            html: Treść strony (surowe bajty lub tekst - zapisywany jako UTF-8)
+            result: Wynik analizy strony (wraz z nagłówkami odpowiedzi)
+        """
+        headers_lower = {k.lower(): v for k, v in result.get("headers", {}).items()}
+        etag = headers_lower.get("etag")
+        last_modified = headers_lower.get("last-modified")
+        if not etag and not last_modified:
+            return
+        self._pending.append((
+            url,
+            etag,
+            last_modified,
+            zlib.compress(html if isinstance(html, bytes) else html.encode("utf-8")),
+            json.dumps(result, ensure_ascii=False, default=str),
+            datetime.now().isoformat(timespec="seconds"),
+        ))
+        if len(self._pending) >= STATE_FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Zapisuje buforowane wpisy w jednej transakcji."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body, result, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                pending,
+            )
+
+    def close(self):
+        """Zapisuje bufor i zamyka połączenie z bazą."""
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
@@ -0,0 +1,80 @@
+"""
+Pula parsowania stron - przenosi pracę CPU (BeautifulSoup, extruct, analizatory)
+poza pętlę zdarzeń asyncio
+"""
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Union
+
+from compass.config import PARSE_EXECUTOR, PARSE_WORKERS
+from .fetcher import analyze_page
+
+
+class ParsePool:
+    """
+    Wykonuje `analyze_page` w puli procesów (domyślnie) lub wątków.
+
+    Jeśli pula procesów nie może zostać utworzona albo ulegnie awarii
+    (np. proces potomny zostanie zabity), pula automatycznie przełącza się
+    na wątki, aby audyt mógł być kontynuowany.
+    """
+
+    def __init__(self, kind: str = PARSE_EXECUTOR, workers: int = PARSE_WORKERS):
+        """
+        Args:
+            kind: Rodzaj puli - "process" lub "thread"
+            workers: Liczba procesów/wątków parsujących
+        """
+        self.workers = max(1, workers)
+        self.kind = kind
+        self._executor = self._create_executor(kind)
+
+    def _create_executor(self, kind: str) -> Executor:
+        if kind == "process":
+            try:
+                return ProcessPoolExecutor(max_workers=self.workers)
+            except (OSError, NotImplementedError, ImportError) as e:
+                print(f"⚠️  Pula procesów niedostępna ({e}), parsowanie w wątkach")
+        self.kind = "thread"
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+
+    async def parse(
+        self,
+        html: Union[str, bytes],
+        url: str,
+        headers: Dict[str, str],
+        encoding: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Analizuje stronę w puli, nie blokując pętli zdarzeń.
+
+        Args:
+            html: Kod HTML strony (tekst lub surowe bajty)
+            url: Końcowy URL strony
+            headers: Nagłówki odpowiedzi HTTP
+            encoding: Kodowanie bajtów (opcjonalnie)
+
+        Returns:
+            Słownik z wynikami analizy strony
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, analyze_page, html, url, headers, encoding)
+        except BrokenProcessPool:
+            # Przełączamy pulę tylko raz, nawet gdy awaria dotknęła wielu zadań naraz
+            if self.kind == "process":
+                print("⚠️  Awaria puli procesów, parsowanie przełączone na wątki")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._create_executor("thread")
+            return await loop.run_in_executor(self._executor, analyze_page, html, url, headers, encoding)
+
+    def close(self):
+        """Zamyka pulę (czeka na zakończenie rozpoczętych zadań)."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,189 @@
+"""
+Harmonogram "politeness" - limity zapytań i połączeń dla każdego hosta osobno
+"""
+import time
+from typing import Dict, Optional
+
+from compass.config import (
+    PER_HOST_CONCURRENCY,
+    PER_HOST_RATE,
+    PER_HOST_BURST,
+    BACKOFF_DEFAULT,
+    BACKOFF_MAX,
+)
+
+
+class TokenBucket:
+    """
+    Klasyczny token bucket: `rate` tokenów na sekundę, maksymalnie `capacity` w zapasie.
+    `rate=None` oznacza brak limitu.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.rate is None:
+            self.tokens = self.capacity
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Zwraca liczbę sekund do dostępności tokena (0 jeśli token jest dostępny)."""
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def take(self):
+        """Pobiera token (wywoływać tylko gdy `delay()` zwróciło 0)."""
+        self.tokens -= 1.0
+
+    def refund(self):
+        """Zwraca niewykorzystany token."""
+        self.tokens = min(self.capacity, self.tokens + 1.0)
+
+
+class _HostState:
+    """Stan pojedynczego hosta: token bucket, aktywne połączenia i ewentualna pauza."""
+
+    def __init__(self, rate: Optional[float], burst: float, max_connections: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_connections = max(1, max_connections)
+        self.active = 0
+        self.paused_until = 0.0
+
+
+def robots_interval(rp, user_agent: str) -> Optional[float]:
+    """
+    Zwraca minimalny odstęp między zapytaniami wynikający z robots.txt
+    (dyrektywy Crawl-delay i Request-rate).
+
+    Args:
+        rp: Parser robots.txt (RobotFileParser)
+        user_agent: User-Agent crawlera
+
+    Returns:
+        Odstęp w sekundach lub None jeśli robots.txt go nie określa
+    """
+    intervals = []
+    try:
+        delay = rp.crawl_delay(user_agent)
+        if delay:
+            intervals.append(float(delay))
+        rate = rp.request_rate(user_agent)
+        if rate and rate.requests:
+            intervals.append(rate.seconds / rate.requests)
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return max(intervals) if intervals else None
+
+
+class HostScheduler:
+    """
+    Pilnuje limitów dla każdego hosta osobno: tempa zapytań (token bucket),
+    liczby równoległych połączeń oraz pauz po odpowiedziach 429/503.
+    Dzięki temu wolny host (np. subdomena) nie blokuje pozostałych.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = PER_HOST_RATE,
+        burst: float = PER_HOST_BURST,
+        max_connections: int = PER_HOST_CONCURRENCY,
+    ):
+        """
+        Args:
+            rate: Domyślna maksymalna liczba zapytań na sekundę do hosta (None = bez limitu)
+            burst: Liczba zapytań, które można wysłać od razu
+            max_connections: Maksymalna liczba równoległych połączeń do hosta
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_connections = max_connections
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = _HostState(self.rate, self.burst, self.max_connections)
+            self._hosts[host] = state
+        return state
+
+    def configure(self, host: str, interval: Optional[float]):
+        """
+        Zaostrza limit tempa hosta zgodnie z Crawl-delay/Request-rate z robots.txt.
+
+        Args:
+            host: Nazwa hosta (netloc)
+            interval: Minimalny odstęp między zapytaniami w sekundach
+        """
+        if not interval or interval <= 0:
+            return
+        state = self._state(host)
+        rate = 1.0 / interval
+        if state.bucket.rate is None or rate < state.bucket.rate:
+            state.bucket.rate = rate
+            state.bucket.capacity = 1.0
+            state.bucket.tokens = min(state.bucket.tokens, 1.0)
+            # Przy Crawl-delay zapytania i tak idą po kolei
+            state.max_connections = 1
+
+    def try_acquire(self, host: str) -> Optional[float]:
+        """
+        Próbuje zarezerwować połączenie i token dla hosta.
+
+        Args:
+            host: Nazwa hosta (netloc)
+
+        Returns:
+            0.0 jeśli rezerwacja się udała, liczba sekund do ponownej próby
+            jeśli brakuje tokena, None jeśli wszystkie połączenia są zajęte
+        """
+        state = self._state(host)
+        if state.active >= state.max_connections:
+            return None
+        now = time.monotonic()
+        if state.paused_until > now:
+            return state.paused_until - now
+        delay = state.bucket.delay(now)
+        if delay > 0:
+            return delay
+        state.bucket.take()
+        state.active += 1
+        return 0.0
+
+    def release(self, host: str, used: bool = True):
+        """
+        Zwalnia połączenie zarezerwowane przez `try_acquire`.
+
+        Args:
+            host: Nazwa hosta (netloc)
+            used: False jeśli zapytanie nie zostało wysłane (token wraca do puli)
+        """
+        state = self._state(host)
+        state.active = max(0, state.active - 1)
+        if not used:
+            state.bucket.refund()
+
+    def backoff(self, host: str, retry_after: Optional[str] = None):
+        """
+        Wstrzymuje zapytania do hosta po odpowiedzi 429/503 i zmniejsza jego tempo o połowę.
+
+        Args:
+            host: Nazwa hosta (netloc)
+            retry_after: Wartość nagłówka Retry-After (w sekundach), jeśli była
+        """
+        try:
+            pause = float(retry_after) if retry_after else BACKOFF_DEFAULT
+        except ValueError:
+            pause = BACKOFF_DEFAULT
+        pause = min(pause, BACKOFF_MAX)
+        state = self._state(host)
+        state.paused_until = max(state.paused_until, time.monotonic() + pause)
+        bucket = state.bucket
+        bucket.rate = (bucket.rate or float(self.max_connections)) / 2
@@ -1,12 +1,22 @@
 """
 Moduł obsługi robots.txt i sitemap.xml
 """
-import re
+import asyncio
+import zlib
 import urllib.parse
 import urllib.robotparser as rps
 import aiohttp
-from typing import List
+from lxml import etree
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
+from compass.config import (
+    USER_AGENT,
+    SITEMAP_CONCURRENCY,
+    SITEMAP_QUEUE_SIZE,
+    SITEMAP_MAX_FILES,
+    SITEMAP_CHUNK_SIZE,
+)
+from compass.utils import stream_timeout
 from .fetcher import fetch
 
 
@@ -24,7 +34,7 @@ async def build_robots(session: aiohttp.ClientSession, root: str) -> rps.RobotFi
     rp = rps.RobotFileParser()
     p = urllib.parse.urlparse(root)
     robots_url = f"{p.scheme}://{p.netloc}/robots.txt"
-    status, final, ct, text, headers = await fetch(session, robots_url)
+    status, final, ct, text, headers, _ = await fetch(session, robots_url)
     rp.set_url(robots_url)
 
     if status and status < 400 and isinstance(text, str) and not text.startswith("__ERROR__"):
@@ -35,30 +45,139 @@ async def build_robots(session: aiohttp.ClientSession, root: str) -> rps.RobotFi
     return rp
 
 
-async def discover_sitemaps(session: aiohttp.ClientSession, root: str) -> List[str]:
+class RobotsCache:
     """
-    Wyszukuje pliki sitemap.xml na stronie.
+    Pobiera robots.txt leniwie, osobno dla każdego hosta (scheme + netloc),
+    i przechowuje sparsowane pliki do końca crawlingu.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        on_load: Optional[Callable[[str, rps.RobotFileParser], None]] = None,
+    ):
+        """
+        Args:
+            session: Sesja aiohttp
+            on_load: Funkcja wywoływana (host, parser) po pobraniu robots.txt hosta
+        """
+        self.session = session
+        self.on_load = on_load
+        self._parsers: Dict[str, rps.RobotFileParser] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get(self, url: str) -> rps.RobotFileParser:
+        """
+        Zwraca parser robots.txt dla hosta URL-a (pobierając go przy pierwszym użyciu).
+
+        Args:
+            url: Dowolny URL z danego hosta
+
+        Returns:
+            Parser robots.txt
+        """
+        p = urllib.parse.urlsplit(url)
+        origin = f"{p.scheme}://{p.netloc}"
+        rp = self._parsers.get(origin)
+        if rp is not None:
+            return rp
+        lock = self._locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            rp = self._parsers.get(origin)
+            if rp is None:
+                rp = await build_robots(self.session, origin)
+                self._parsers[origin] = rp
+                if self.on_load:
+                    self.on_load(p.netloc.lower(), rp)
+        return rp
+
+
+async def discover_sitemaps(
+    session: aiohttp.ClientSession,
+    root: str,
+    rp: Optional[rps.RobotFileParser] = None,
+) -> List[str]:
+    """
+    Wyszukuje pliki sitemap witryny: najpierw dyrektywy `Sitemap:` z robots.txt,
+    a gdy ich brak - standardowe lokalizacje (/sitemap.xml, /sitemap_index.xml).
+    Pliki nie są tu pobierane - nieistniejące kandydaty pominie `stream_sitemaps`.
 
     Args:
         session: Sesja aiohttp
         root: URL główny witryny
+        rp: Sparsowany robots.txt (jeśli brak, zostanie pobrany)
 
     Returns:
-        Lista URL-i znalezionych plików sitemap
+        Lista URL-i plików sitemap
     """
+    if rp is None:
+        rp = await build_robots(session, root)
+    found = list(dict.fromkeys(rp.site_maps() or []))
+    if found:
+        return found
+
     p = urllib.parse.urlparse(root)
-    candidates = [
+    return [
         f"{p.scheme}://{p.netloc}/sitemap.xml",
         f"{p.scheme}://{p.netloc}/sitemap_index.xml",
     ]
 
-    found = []
-    for u in candidates:
-        status, final, ct, text, headers = await fetch(session, u)
-        if status and status < 400 and "xml" in ct.lower():
-            found.append(final)
 
-    return found
+def _local_name(tag: str) -> str:
+    """Zwraca nazwę tagu XML bez przestrzeni nazw."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_priority(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class SitemapParser:
+    """
+    Inkrementalny parser XML sitemap (urlset i sitemapindex) oparty na lxml.
+
+    Dane można podawać kawałkami (`feed`); przetworzone elementy są od razu
+    usuwane z drzewa, więc zużycie pamięci nie zależy od rozmiaru pliku.
+    """
+
+    def __init__(self):
+        self._parser = etree.XMLPullParser(
+            events=("end",),
+            tag=("{*}url", "{*}sitemap"),
+            resolve_entities=False,
+            no_network=True,
+            huge_tree=True,
+        )
+
+    def feed(self, data: bytes) -> Iterator[Tuple[str, Any]]:
+        """
+        Przetwarza kolejny fragment XML.
+
+        Args:
+            data: Fragment pliku sitemap
+
+        Yields:
+            ("url", (loc, lastmod, priority)) dla wpisów <url>
+            ("sitemap", loc) dla wpisów <sitemap> z indeksu sitemap
+        """
+        self._parser.feed(data)
+        for _, elem in self._parser.read_events():
+            fields = {_local_name(child.tag): child.text for child in elem if isinstance(child.tag, str)}
+            loc = (fields.get("loc") or "").strip()
+            if loc:
+                if _local_name(elem.tag) == "url":
+                    lastmod = (fields.get("lastmod") or "").strip() or None
+                    yield "url", (loc, lastmod, _parse_priority(fields.get("priority")))
+                else:
+                    yield "sitemap", loc
+            # Zwolnienie przetworzonego elementu
+            elem.clear(keep_tail=True)
+            parent = elem.getparent()
+            if parent is not None:
+                parent.remove(elem)
 
 
 def parse_sitemap_xml(xml_text: str) -> List[str]:
@@ -69,15 +188,109 @@ def parse_sitemap_xml(xml_text: str) -> List[str]:
         xml_text: Zawartość pliku sitemap XML
 
     Returns:
-        Lista URL-i ze sitemap
+        Lista URL-i ze sitemap (wpisy <url> i <sitemap>)
+    """
+    parser = SitemapParser()
+    return [
+        value[0] if kind == "url" else value
+        for kind, value in parser.feed(xml_text.encode("utf-8"))
+    ]
+
+
+async def iter_sitemap(session: aiohttp.ClientSession, url: str) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Strumieniowo pobiera i parsuje pojedynczy plik sitemap (także .xml.gz).
+
+    Args:
+        session: Sesja aiohttp
+        url: URL pliku sitemap
+
+    Yields:
+        Wpisy w formacie `SitemapParser.feed`
+    """
+    parser = SitemapParser()
+    decompressor = None
+    first = True
+    # Bez limitu całkowitego - duże pliki są czytane stopniowo, w tempie konsumenta
+    async with session.get(url, timeout=stream_timeout(), headers={"User-Agent": USER_AGENT}) as r:
+        if r.status >= 400:
+            return
+        async for chunk in r.content.iter_chunked(SITEMAP_CHUNK_SIZE):
+            if first:
+                first = False
+                # Plik .xml.gz (bez Content-Encoding) - rozpakowujemy w locie
+                if chunk[:2] == b"\x1f\x8b":
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            for entry in parser.feed(chunk):
+                yield entry
+
+
+async def stream_sitemaps(
+    session: aiohttp.ClientSession,
+    sitemap_urls: List[str],
+    concurrency: int = SITEMAP_CONCURRENCY,
+) -> AsyncIterator[Tuple[str, Optional[str], Optional[float]]]:
+    """
+    Strumieniowo czyta zestaw plików sitemap, rekurencyjnie wchodząc w indeksy
+    sitemap. Pliki są czytane równolegle (maks. `concurrency` naraz), a wyniki
+    przekazywane przez ograniczoną kolejkę - wolny konsument wstrzymuje czytanie.
+
+    Args:
+        session: Sesja aiohttp
+        sitemap_urls: Lista URL-i plików sitemap
+        concurrency: Maksymalna liczba równolegle czytanych plików
+
+    Yields:
+        Krotki (loc, lastmod, priority)
     """
-    urls = re.findall(r"<loc>(.*?)</loc>", xml_text, flags=re.I | re.S)
-    return [u.strip() for u in urls if u.strip()]
+    out: asyncio.Queue = asyncio.Queue(maxsize=SITEMAP_QUEUE_SIZE)
+    todo: asyncio.Queue = asyncio.Queue()
+    scheduled: Set[str] = set()
+
+    def schedule(sm: str):
+        if sm not in scheduled and len(scheduled) < SITEMAP_MAX_FILES:
+            scheduled.add(sm)
+            todo.put_nowait(sm)
+
+    async def reader():
+        while True:
+            sm = await todo.get()
+            try:
+                async for kind, value in iter_sitemap(session, sm):
+                    if kind == "sitemap":
+                        schedule(value)
+                    else:
+                        await out.put(value)
+            except (aiohttp.ClientError, asyncio.TimeoutError, etree.XMLSyntaxError, zlib.error) as e:
+                print(f"⚠️  Błąd przy czytaniu sitemap {sm}: {e}")
+            finally:
+                todo.task_done()
+
+    async def supervisor():
+        await todo.join()
+        await out.put(None)
+
+    for sm in sitemap_urls:
+        schedule(sm)
+    tasks = [asyncio.create_task(reader()) for _ in range(max(1, concurrency))]
+    tasks.append(asyncio.create_task(supervisor()))
+    try:
+        while True:
+            entry = await out.get()
+            if entry is None:
+                break
+            yield entry
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 
 async def fetch_and_parse_sitemaps(session: aiohttp.ClientSession, sitemap_urls: List[str]) -> List[str]:
     """
-    Pobiera i parsuje wszystkie pliki sitemap.
+    Pobiera i parsuje wszystkie pliki sitemap (wraz z indeksami).
 
     Args:
         session: Sesja aiohttp
@@ -86,10 +299,5 @@ async def fetch_and_parse_sitemaps(session: aiohttp.ClientSession, sitemap_urls:
     Returns:
         Lista wszystkich URL-i znalezionych w sitemap
     """
-    urls: List[str] = []
-    for sm in sitemap_urls:
-        status, final, ct, text, headers = await fetch(session, sm)
-        if status and status < 400 and isinstance(text, str) and not text.startswith("__ERROR__"):
-            urls += parse_sitemap_xml(text)
-
+    urls: List[str] = [loc async for loc, _, _ in stream_sitemaps(session, sitemap_urls)]
     return list(dict.fromkeys(urls))
@@ -0,0 +1,182 @@
+"""
+Kompaktowe zbiory odwiedzonych URL-i (seen-set) dla bardzo dużych crawli
+"""
+import hashlib
+import math
+from array import array
+from typing import Iterable, List
+
+from compass.config import SEEN_SET_MODE, BLOOM_CAPACITY, BLOOM_ERROR_RATE
+
+
+def url_fingerprint(url: str) -> int:
+    """
+    Zwraca 64-bitowy odcisk (fingerprint) URL-a.
+    Przy milionach URL-i prawdopodobieństwo kolizji jest pomijalne (~1e-8).
+
+    Args:
+        url: Znormalizowany URL
+
+    Returns:
+        Liczba całkowita z zakresu 1..2^64-1
+    """
+    fp = int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+    return fp or 1
+
+
+class FingerprintSet:
+    """
+    Dokładny zbiór URL-i przechowujący jedynie 64-bitowe odciski w tablicy
+    `array('Q')` z adresowaniem otwartym (linear probing).
+    Zajmuje ~16-32 bajty na URL zamiast kilkuset bajtów dla obiektu str w set().
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Args:
+            capacity: Spodziewana liczba URL-i (tablica i tak rośnie automatycznie)
+        """
+        size = 1 << max(4, (2 * capacity - 1).bit_length())
+        self._table = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _slot(self, fp: int) -> int:
+        table, mask = self._table, self._mask
+        i = fp & mask
+        while True:
+            value = table[i]
+            if value == 0 or value == fp:
+                return i
+            i = (i + 1) & mask
+
+    def __contains__(self, url: str) -> bool:
+        fp = url_fingerprint(url)
+        return self._table[self._slot(fp)] == fp
+
+    def add(self, url: str):
+        """Dodaje URL do zbioru."""
+        self._add_fingerprint(url_fingerprint(url))
+
+    def _add_fingerprint(self, fp: int):
+        i = self._slot(fp)
+        if self._table[i] == fp:
+            return
+        self._table[i] = fp
+        self._len += 1
+        # Utrzymujemy współczynnik zapełnienia poniżej 70%
+        if self._len * 10 >= len(self._table) * 7:
+            self._grow()
+
+    def _grow(self):
+        old = self._table
+        self._table = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._table) - 1
+        self._len = 0
+        for fp in old:
+            if fp:
+                self._add_fingerprint(fp)
+
+    def update(self, urls: Iterable[str]):
+        """Dodaje wiele URL-i do zbioru."""
+        for url in urls:
+            self.add(url)
+
+
+class BloomFilter:
+    """
+    Przybliżony zbiór URL-i (skalowalny filtr Blooma).
+
+    Może błędnie uznać nowy URL za odwiedzony z prawdopodobieństwem
+    ok. `error_rate` (taki URL zostanie pominięty), ale nigdy odwrotnie.
+    Po przekroczeniu pojemności dodawana jest kolejna warstwa o podwójnej
+    pojemności i połowie dopuszczalnego błędu, więc łączny błąd pozostaje
+    ograniczony przez ~2 x `error_rate`.
+    """
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE):
+        """
+        Args:
+            capacity: Liczba URL-i mieszcząca się w pierwszej warstwie
+            error_rate: Dopuszczalny odsetek fałszywych trafień
+        """
+        self.error_rate = error_rate
+        self._layers: List[_BloomLayer] = [_BloomLayer(capacity, error_rate / 2)]
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, url: str) -> bool:
+        fp = url_fingerprint(url)
+        return any(layer.contains(fp) for layer in self._layers)
+
+    def add(self, url: str):
+        """Dodaje URL do filtra."""
+        fp = url_fingerprint(url)
+        if any(layer.contains(fp) for layer in self._layers):
+            return
+        layer = self._layers[-1]
+        if layer.count >= layer.capacity:
+            layer = _BloomLayer(layer.capacity * 2, layer.error_rate / 2)
+            self._layers.append(layer)
+        layer.add(fp)
+        self._len += 1
+
+    def update(self, urls: Iterable[str]):
+        """Dodaje wiele URL-i do filtra."""
+        for url in urls:
+            self.add(url)
+
+
+class _BloomLayer:
+    """Pojedyncza warstwa filtra Blooma o stałej pojemności."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.bits = max(64, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, fp: int) -> List[int]:
+        # Podwójne haszowanie (Kirsch-Mitzenmacher) z jednego 64-bitowego odcisku
+        h1 = fp & 0xFFFFFFFF
+        h2 = (fp >> 32) | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def contains(self, fp: int) -> bool:
+        array_ = self._array
+        for pos in self._positions(fp):
+            if not array_[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, fp: int):
+        array_ = self._array
+        for pos in self._positions(fp):
+            array_[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+
+def make_seen_set(mode: str = SEEN_SET_MODE):
+    """
+    Tworzy zbiór odwiedzonych URL-i w wybranym trybie.
+
+    Args:
+        mode: "exact" - odciski 64-bit (domyślnie), "bloom" - filtr Blooma,
+            "set" - zwykły set() z pełnymi URL-ami
+
+    Returns:
+        Obiekt obsługujący `in`, `add()`, `update()` i `len()`
+    """
+    if mode == "bloom":
+        return BloomFilter()
+    if mode == "set":
+        return set()
+    return FingerprintSet()
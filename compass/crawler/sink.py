@@ -0,0 +1,95 @@
+"""
+Strumieniowy zapis wyników stron do pliku JSONL (opcjonalnie gzip)
+"""
+import gzip
+import json
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from compass.config import RESULTS_COMPRESS
+
+
+def _open_text(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=5)
+    return open(path, mode, encoding="utf-8")
+
+
+class PageStream:
+    """
+    Wyniki stron zapisane w pliku JSONL, czytane strumieniowo.
+
+    Udostępnia podzbiór interfejsu słownika (`items()`, `values()`,
+    iterację po URL-ach i `len()`), więc może zastąpić słownik
+    `URL -> dane strony` w generatorach raportów. Każde wywołanie
+    `items()` czyta plik od początku - w pamięci jest tylko jedna strona.
+    """
+
+    def __init__(self, path: str, count: Optional[int] = None):
+        """
+        Args:
+            path: Ścieżka do pliku .jsonl lub .jsonl.gz
+            count: Liczba stron w pliku (jeśli znana)
+        """
+        self.path = path
+        self._count = count
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = sum(1 for _ in self.items())
+        return self._count
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Zwraca kolejne pary (url, dane strony)."""
+        with _open_text(self.path, "r") as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    yield item["url"], item
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        """Zwraca kolejne dane stron."""
+        for _, item in self.items():
+            yield item
+
+    def __iter__(self) -> Iterator[str]:
+        for url, _ in self.items():
+            yield url
+
+
+class ResultSink:
+    """
+    Dopisuje wynik każdej przetworzonej strony jako jedną linię JSON,
+    dzięki czemu crawler nie musi trzymać wszystkich wyników w pamięci.
+    """
+
+    def __init__(self, path: str, compress: bool = RESULTS_COMPRESS):
+        """
+        Args:
+            path: Ścieżka do pliku wynikowego (.jsonl)
+            compress: Czy kompresować plik gzipem (dodaje rozszerzenie .gz)
+        """
+        if compress and not path.endswith(".gz"):
+            path += ".gz"
+        self.path = path
+        self.count = 0
+        self._file = _open_text(path, "w")
+
+    def write(self, item: Dict[str, Any]):
+        """Dopisuje wynik strony (słownik z kluczem "url")."""
+        self._file.write(json.dumps(item, ensure_ascii=False, default=str))
+        self._file.write("\n")
+        self.count += 1
+
+    def flush(self):
+        """Wymusza zapis bufora na dysk."""
+        self._file.flush()
+
+    def close(self):
+        """Zamyka plik wynikowy."""
+        if not self._file.closed:
+            self._file.close()
+
+    def pages(self) -> PageStream:
+        """Zwraca strumień zapisanych wyników (po zamknięciu pliku)."""
+        self.close()
+        return PageStream(self.path, self.count)
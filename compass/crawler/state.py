@@ -0,0 +1,193 @@
+"""
+Trwały stan crawlingu w SQLite - pozwala wznowić przerwany audyt
+"""
+import os
+import json
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from compass.config import STATE_DB_PATH, STATE_FLUSH_EVERY, STATE_FLUSH_INTERVAL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    start_url TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frontier (
+    run_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (run_id, url)
+);
+CREATE TABLE IF NOT EXISTS seen (
+    run_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (run_id, url)
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, url)
+);
+"""
+
+
+class CrawlState:
+    """
+    Stan crawlingu zapisywany w bazie SQLite: kolejka (frontier), zbiór
+    odwiedzonych URL-i, wyniki stron i metadane audytu.
+
+    Zapisy są buforowane i wykonywane partiami w jednej transakcji
+    (co `STATE_FLUSH_EVERY` operacji lub `STATE_FLUSH_INTERVAL` sekund),
+    więc baza nie spowalnia crawlingu. URL-e, które były w trakcie
+    przetwarzania w chwili przerwania, zostaną pobrane ponownie.
+    """
+
+    def __init__(self, run_id: str, path: str = STATE_DB_PATH):
+        """
+        Args:
+            run_id: Identyfikator audytu
+            path: Ścieżka do pliku bazy SQLite
+        """
+        self.run_id = run_id
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self._urls: List[Tuple[str, str, int]] = []
+        self._results: List[Tuple[str, str, str]] = []
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def create(cls, run_id: str, start_url: str, output_dir: str, path: str = STATE_DB_PATH) -> "CrawlState":
+        """
+        Rejestruje nowy audyt w bazie.
+
+        Args:
+            run_id: Identyfikator audytu
+            start_url: URL startowy
+            output_dir: Katalog wyjściowy raportów
+            path: Ścieżka do pliku bazy SQLite
+
+        Returns:
+            Stan nowego audytu
+        """
+        state = cls(run_id, path)
+        now = datetime.now().isoformat(timespec="seconds")
+        with state.conn:
+            state.conn.execute(
+                "INSERT INTO runs (run_id, start_url, output_dir, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'running', ?, ?)",
+                (run_id, start_url, output_dir, now, now),
+            )
+        return state
+
+    @classmethod
+    def open(cls, run_id: str, path: str = STATE_DB_PATH) -> "CrawlState":
+        """
+        Otwiera stan istniejącego audytu.
+
+        Args:
+            run_id: Identyfikator audytu
+            path: Ścieżka do pliku bazy SQLite
+
+        Returns:
+            Stan audytu
+
+        Raises:
+            KeyError: Jeśli audyt o podanym identyfikatorze nie istnieje
+        """
+        state = cls(run_id, path)
+        if state.meta is None:
+            state.close()
+            raise KeyError(run_id)
+        return state
+
+    @property
+    def meta(self) -> Optional[Dict[str, Any]]:
+        """Metadane audytu (start_url, output_dir, status, daty) lub None."""
+        row = self.conn.execute(
+            "SELECT start_url, output_dir, status, created_at, updated_at FROM runs WHERE run_id = ?",
+            (self.run_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ("start_url", "output_dir", "status", "created_at", "updated_at")
+        return dict(zip(keys, row))
+
+    def pending(self) -> List[Tuple[str, int]]:
+        """
+        Zwraca zapisaną kolejkę URL-i do odwiedzenia (bez już przetworzonych).
+
+        Returns:
+            Lista krotek (url, depth) w kolejności dodania
+        """
+        return self.conn.execute(
+            "SELECT url, depth FROM frontier f WHERE run_id = ? AND NOT EXISTS "
+            "(SELECT 1 FROM results r WHERE r.run_id = f.run_id AND r.url = f.url) ORDER BY rowid",
+            (self.run_id,),
+        ).fetchall()
+
+    def iter_seen(self) -> Iterator[str]:
+        """Zwraca kolejne zapisane odwiedzone URL-e (bez wczytywania wszystkich naraz)."""
+        for (url,) in self.conn.execute("SELECT url FROM seen WHERE run_id = ?", (self.run_id,)):
+            yield url
+
+    def iter_results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Zwraca kolejne zapisane wyniki stron jako pary (url, dane)."""
+        for url, data in self.conn.execute("SELECT url, data FROM results WHERE run_id = ?", (self.run_id,)):
+            yield url, json.loads(data)
+
+    def add_url(self, url: str, depth: int):
+        """Zapamiętuje URL dodany do kolejki (i do zbioru odwiedzonych)."""
+        self._urls.append((self.run_id, url, depth))
+        self._maybe_flush()
+
+    def add_result(self, url: str, item: Dict[str, Any]):
+        """Zapamiętuje wynik przetworzonej strony."""
+        self._results.append((self.run_id, url, json.dumps(item, ensure_ascii=False, default=str)))
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        pending = len(self._urls) + len(self._results)
+        if pending >= STATE_FLUSH_EVERY or time.monotonic() - self._last_flush >= STATE_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Zapisuje buforowane zmiany w jednej transakcji."""
+        self._last_flush = time.monotonic()
+        if not self._urls and not self._results:
+            return
+        urls, results = self._urls, self._results
+        self._urls, self._results = [], []
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO seen (run_id, url) VALUES (?, ?)",
+                                  [(r, u) for r, u, _ in urls])
+            self.conn.executemany("INSERT OR IGNORE INTO frontier (run_id, url, depth) VALUES (?, ?, ?)", urls)
+            self.conn.executemany("INSERT OR REPLACE INTO results (run_id, url, data) VALUES (?, ?, ?)", results)
+            self.conn.executemany("DELETE FROM frontier WHERE run_id = ? AND url = ?",
+                                  [(r, u) for r, u, _ in results])
+            self.conn.execute(
+                "UPDATE runs SET updated_at = ? WHERE run_id = ?",
+                (datetime.now().isoformat(timespec="seconds"), self.run_id),
+            )
+
+    def finish(self):
+        """Zapisuje bufor i oznacza audyt jako zakończony."""
+        self.flush()
+        with self.conn:
+            self.conn.execute("UPDATE runs SET status = 'done' WHERE run_id = ?", (self.run_id,))
+
+    def close(self):
+        """Zapisuje bufor i zamyka połączenie z bazą."""
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
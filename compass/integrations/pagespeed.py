@@ -1,17 +1,20 @@
 """
 Integracja z Google PageSpeed Insights API
 """
+import contextlib
 import aiohttp
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from compass.config import USE_PAGESPEED, PAGESPEED_API_KEY
+from compass.utils import create_session
 
 
-async def check_pagespeed(url: str) -> Dict[str, Any]:
+async def check_pagespeed(url: str, session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Any]:
     """
     Sprawdza metryki PageSpeed Insights dla danego URL.
 
     Args:
         url: URL strony do sprawdzenia
+        session: Sesja HTTP do ponownego użycia (domyślnie tworzona jednorazowo)
 
     Returns:
         Słownik z wynikami PageSpeed (performance, accessibility, seo, core web vitals)
@@ -28,8 +31,8 @@ async def check_pagespeed(url: str) -> Dict[str, Any]:
             "category": ["performance", "accessibility", "best-practices", "seo"]
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(api_url, params=params, timeout=60) as resp:
+        async with contextlib.nullcontext(session) if session else create_session() as session:
+            async with session.get(api_url, params=params, timeout=aiohttp.ClientTimeout(total=60)) as resp:
                 if resp.status == 200:
                     data = await resp.json()
                     lighthouse = data.get("lighthouseResult", {})
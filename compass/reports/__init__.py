@@ -1,7 +1,7 @@
 """
 Moduł generowania raportów
 """
-from .analyzer import find_duplicates, analyze_issues, calculate_summary, calculate_overall_score
+from .analyzer import find_duplicates, analyze_issues, calculate_summary, calculate_overall_score, analyze_pages
 from .report_generator import save_reports
 
 __all__ = [
@@ -9,5 +9,6 @@ __all__ = [
     'analyze_issues',
     'calculate_summary',
     'calculate_overall_score',
+    'analyze_pages',
     'save_reports',
 ]
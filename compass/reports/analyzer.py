@@ -2,7 +2,7 @@
 Analizator wyników crawlingu - znajdowanie duplikatów i problemów
 """
 from collections import defaultdict
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 
@@ -31,24 +31,33 @@ def find_duplicates(all_pages: Dict[str, Any]) -> Dict[str, List]:
     Returns:
         Słownik z duplikatami title i description
     """
-    title_map = defaultdict(list)
-    desc_map = defaultdict(list)
-
+    maps = (defaultdict(list), defaultdict(list))
     for url, data in all_pages.items():
-        # Pomijamy strony wykluczone i noindex
-        if data.get('is_excluded'):
-            continue
-        if is_noindex_page(data):
-            continue
+        _collect_duplicates(maps, url, data)
+    return _duplicates_from_maps(maps)
+
+
+def _collect_duplicates(maps: Tuple[Dict[str, List], Dict[str, List]], url: str, data: Dict[str, Any]):
+    """Dopisuje title i description strony do map wartość -> lista URL-i."""
+    # Pomijamy strony wykluczone i noindex
+    if data.get('is_excluded'):
+        return
+    if is_noindex_page(data):
+        return
+
+    title_map, desc_map = maps
+    title = data.get('title', '').strip()
+    desc = data.get('meta_description', '').strip()
 
-        title = data.get('title', '').strip()
-        desc = data.get('meta_description', '').strip()
+    if title:
+        title_map[title].append(url)
+    if desc:
+        desc_map[desc].append(url)
 
-        if title:
-            title_map[title].append(url)
-        if desc:
-            desc_map[desc].append(url)
 
+def _duplicates_from_maps(maps: Tuple[Dict[str, List], Dict[str, List]]) -> Dict[str, List]:
+    """Zostawia w mapach tylko wartości występujące na więcej niż jednej stronie."""
+    title_map, desc_map = maps
     duplicates = {
         "title": {k: v for k, v in title_map.items() if len(v) > 1},
         "description": {k: v for k, v in desc_map.items() if len(v) > 1},
@@ -92,7 +101,15 @@ def analyze_issues(all_pages: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         Słownik ze znalezionymi problemami w kategoriach
     """
-    issues = {
+    issues = _new_issues()
+    for url, data in all_pages.items():
+        _collect_issues(issues, url, data)
+    return issues
+
+
+def _new_issues() -> Dict[str, List]:
+    """Tworzy pusty słownik kategorii problemów."""
+    return {
         "critical_errors": [],
         "missing_title": [],
         "missing_description": [],
@@ -116,177 +133,184 @@ def analyze_issues(all_pages: Dict[str, Any]) -> Dict[str, Any]:
         "info_disclosure": [],
     }
 
-    for url, data in all_pages.items():
-        # Pomijamy strony wykluczone i noindex
-        if data.get('is_excluded'):
-            continue
-        if is_noindex_page(data):
-            continue
-
-        ct = data.get('content_type', '') or ''
-        status = data.get('status')
-        is_system = is_system_page_data(data)
-
-        # Błędy krytyczne - analizujemy wszystkie strony
-        if data.get('error') or (status and 400 <= status < 500):
-            if 'text/html' in ct or not ct:
-                issues['critical_errors'].append({
-                    'url': url,
-                    'status': status,
-                    'error': data.get('error', '')
-                })
-
-        if not status or status >= 400:
-            continue
-
-        # === ANALIZY DLA WSZYSTKICH STRON (włącznie z systemowymi) ===
-
-        # Brak viewport (mobile-friendly) - każda strona powinna być responsywna
-        if not data.get('is_mobile_friendly'):
-            issues['no_viewport'].append(url)
-
-        # Problemy z bezpieczeństwem - każda strona powinna być bezpieczna
-        security = data.get('security', {})
-
-        # Brak SSL
-        if not security.get('has_ssl'):
-            issues['no_ssl'].append(url)
-
-        # Słabe bezpieczeństwo
-        sec_percentage = security.get('security_percentage', 100)
-        if sec_percentage < 50:
-            issues['poor_security'].append({
-                'url': url,
-                'security_percentage': sec_percentage,
-                'security_level': security.get('security_level'),
-                'missing_headers': security.get('missing_critical', []),
-            })
-
-        # Brakujące nagłówki bezpieczeństwa
-        headers_count = security.get('headers_count', 0)
-        if headers_count < 3:
-            issues['missing_security_headers'].append({
-                'url': url,
-                'headers_count': headers_count,
-                'missing_critical': security.get('missing_critical', []),
-            })
-
-        # Mixed content
-        if security.get('has_mixed_content'):
-            issues['mixed_content'].append(url)
 
-        # Information disclosure
-        if security.get('exposes_server_info') or security.get('exposes_tech_stack'):
-            issues['info_disclosure'].append({
-                'url': url,
-                'server_header': security.get('server_header'),
-                'powered_by': security.get('powered_by_header'),
-            })
-
-        # === ANALIZY TYLKO DLA STRON TREŚCIOWYCH (nie systemowych) ===
-        if is_system:
-            continue  # Pomijamy dalszą analizę dla stron systemowych
-
-        # Brak title
-        if not data.get('title'):
-            issues['missing_title'].append(url)
-        else:
-            meta_scores = data.get('meta_scores', {})
-            if meta_scores.get('title_too_short') or meta_scores.get('title_too_long'):
-                issues['title_issues'].append({
-                    'url': url,
-                    'title': data.get('title'),
-                    'length': meta_scores.get('title_length'),
-                    'too_short': meta_scores.get('title_too_short'),
-                    'too_long': meta_scores.get('title_too_long'),
-                })
-
-        # Brak description
-        if not data.get('meta_description'):
-            issues['missing_description'].append(url)
-        else:
-            meta_scores = data.get('meta_scores', {})
-            if meta_scores.get('desc_too_short') or meta_scores.get('desc_too_long'):
-                issues['description_issues'].append({
-                    'url': url,
-                    'description': data.get('meta_description')[:100],
-                    'length': meta_scores.get('desc_length'),
-                    'too_short': meta_scores.get('desc_too_short'),
-                    'too_long': meta_scores.get('desc_too_long'),
-                })
-
-        # Brak canonical
-        if not data.get('canonical'):
-            issues['missing_canonical'].append(url)
-
-        # Problemy z H1
-        h1_count = data.get('h1_count', 0)
-        if h1_count == 0:
-            issues['missing_h1'].append(url)
-        elif h1_count > 1:
-            issues['multiple_h1'].append({
-                'url': url,
-                'h1_count': h1_count,
-                'h1_list': data.get('h1', [])
-            })
-
-        # Obrazy bez ALT
-        if data.get('img_without_alt', 0) > 0:
-            issues['images_no_alt'].append({
-                'url': url,
-                'missing_alt': data.get('img_without_alt'),
-                'total_images': data.get('img_total'),
-                'alt_ratio': data.get('img_alt_ratio'),
-            })
-
-        # Brak Open Graph
-        if not data.get('has_og_image') or not data.get('has_og_title'):
-            issues['no_og_tags'].append({
-                'url': url,
-                'has_og_image': data.get('has_og_image'),
-                'has_og_title': data.get('has_og_title'),
-                'has_og_description': data.get('has_og_description'),
-            })
-
-        # Brak Twitter Cards
-        if not data.get('has_twitter_card'):
-            issues['no_twitter_cards'].append(url)
-
-        # Brak Schema.org
-        if data.get('schema_count', 0) == 0:
-            issues['missing_schema'].append(url)
+def _collect_issues(issues: Dict[str, List], url: str, data: Dict[str, Any]):
+    """
+    Dopisuje problemy pojedynczej strony do słownika problemów.
 
-        # Słabe sygnały E-E-A-T - tylko dla stron treściowych
-        eeat = data.get('eeat_signals', {})
-        if eeat.get('eeat_percentage', 100) < 50:
-            issues['weak_eeat'].append({
+    Args:
+        issues: Słownik kategorii problemów (z `_new_issues()`)
+        url: URL strony
+        data: Dane strony
+    """
+    # Pomijamy strony wykluczone i noindex
+    if data.get('is_excluded'):
+        return
+    if is_noindex_page(data):
+        return
+
+    ct = data.get('content_type', '') or ''
+    status = data.get('status')
+    is_system = is_system_page_data(data)
+
+    # Błędy krytyczne - analizujemy wszystkie strony
+    if data.get('error') or (status and 400 <= status < 500):
+        if 'text/html' in ct or not ct:
+            issues['critical_errors'].append({
                 'url': url,
-                'eeat_score': eeat.get('eeat_score'),
-                'eeat_percentage': eeat.get('eeat_percentage'),
-                'missing': [k for k, v in eeat.items() if k.startswith('has_') and not v]
+                'status': status,
+                'error': data.get('error', '')
             })
 
-        # Słabe NAP (Local SEO) - tylko dla stron treściowych
-        nap = data.get('nap_signals', {})
-        if nap.get('nap_score', 0) < 2:
-            issues['poor_local_seo'].append({
+    if not status or status >= 400:
+        return
+
+    # === ANALIZY DLA WSZYSTKICH STRON (włącznie z systemowymi) ===
+
+    # Brak viewport (mobile-friendly) - każda strona powinna być responsywna
+    if not data.get('is_mobile_friendly'):
+        issues['no_viewport'].append(url)
+
+    # Problemy z bezpieczeństwem - każda strona powinna być bezpieczna
+    security = data.get('security', {})
+
+    # Brak SSL
+    if not security.get('has_ssl'):
+        issues['no_ssl'].append(url)
+
+    # Słabe bezpieczeństwo
+    sec_percentage = security.get('security_percentage', 100)
+    if sec_percentage < 50:
+        issues['poor_security'].append({
+            'url': url,
+            'security_percentage': sec_percentage,
+            'security_level': security.get('security_level'),
+            'missing_headers': security.get('missing_critical', []),
+        })
+
+    # Brakujące nagłówki bezpieczeństwa
+    headers_count = security.get('headers_count', 0)
+    if headers_count < 3:
+        issues['missing_security_headers'].append({
+            'url': url,
+            'headers_count': headers_count,
+            'missing_critical': security.get('missing_critical', []),
+        })
+
+    # Mixed content
+    if security.get('has_mixed_content'):
+        issues['mixed_content'].append(url)
+
+    # Information disclosure
+    if security.get('exposes_server_info') or security.get('exposes_tech_stack'):
+        issues['info_disclosure'].append({
+            'url': url,
+            'server_header': security.get('server_header'),
+            'powered_by': security.get('powered_by_header'),
+        })
+
+    # === ANALIZY TYLKO DLA STRON TREŚCIOWYCH (nie systemowych) ===
+    if is_system:
+        return  # Pomijamy dalszą analizę dla stron systemowych
+
+    # Brak title
+    if not data.get('title'):
+        issues['missing_title'].append(url)
+    else:
+        meta_scores = data.get('meta_scores', {})
+        if meta_scores.get('title_too_short') or meta_scores.get('title_too_long'):
+            issues['title_issues'].append({
                 'url': url,
-                'nap_score': nap.get('nap_score'),
-                'phone_numbers': nap.get('phone_numbers_found'),
-                'has_address': nap.get('has_address_indicators'),
-                'has_local_schema': nap.get('has_local_business_schema'),
+                'title': data.get('title'),
+                'length': meta_scores.get('title_length'),
+                'too_short': meta_scores.get('title_too_short'),
+                'too_long': meta_scores.get('title_too_long'),
             })
 
-        # Thin content
-        word_count = data.get('word_count', 0) or 0
-        if word_count < 300 and word_count > 0:
-            issues['thin_content'].append({
+    # Brak description
+    if not data.get('meta_description'):
+        issues['missing_description'].append(url)
+    else:
+        meta_scores = data.get('meta_scores', {})
+        if meta_scores.get('desc_too_short') or meta_scores.get('desc_too_long'):
+            issues['description_issues'].append({
                 'url': url,
-                'word_count': word_count,
-                'text_len': data.get('text_len', 0)
+                'description': data.get('meta_description')[:100],
+                'length': meta_scores.get('desc_length'),
+                'too_short': meta_scores.get('desc_too_short'),
+                'too_long': meta_scores.get('desc_too_long'),
             })
 
-    return issues
+    # Brak canonical
+    if not data.get('canonical'):
+        issues['missing_canonical'].append(url)
+
+    # Problemy z H1
+    h1_count = data.get('h1_count', 0)
+    if h1_count == 0:
+        issues['missing_h1'].append(url)
+    elif h1_count > 1:
+        issues['multiple_h1'].append({
+            'url': url,
+            'h1_count': h1_count,
+            'h1_list': data.get('h1', [])
+        })
+
+    # Obrazy bez ALT
+    if data.get('img_without_alt', 0) > 0:
+        issues['images_no_alt'].append({
+            'url': url,
+            'missing_alt': data.get('img_without_alt'),
+            'total_images': data.get('img_total'),
+            'alt_ratio': data.get('img_alt_ratio'),
+        })
+
+    # Brak Open Graph
+    if not data.get('has_og_image') or not data.get('has_og_title'):
+        issues['no_og_tags'].append({
+            'url': url,
+            'has_og_image': data.get('has_og_image'),
+            'has_og_title': data.get('has_og_title'),
+            'has_og_description': data.get('has_og_description'),
+        })
+
+    # Brak Twitter Cards
+    if not data.get('has_twitter_card'):
+        issues['no_twitter_cards'].append(url)
+
+    # Brak Schema.org
+    if data.get('schema_count', 0) == 0:
+        issues['missing_schema'].append(url)
+
+    # Słabe sygnały E-E-A-T - tylko dla stron treściowych
+    eeat = data.get('eeat_signals', {})
+    if eeat.get('eeat_percentage', 100) < 50:
+        issues['weak_eeat'].append({
+            'url': url,
+            'eeat_score': eeat.get('eeat_score'),
+            'eeat_percentage': eeat.get('eeat_percentage'),
+            'missing': [k for k, v in eeat.items() if k.startswith('has_') and not v]
+        })
+
+    # Słabe NAP (Local SEO) - tylko dla stron treściowych
+    nap = data.get('nap_signals', {})
+    if nap.get('nap_score', 0) < 2:
+        issues['poor_local_seo'].append({
+            'url': url,
+            'nap_score': nap.get('nap_score'),
+            'phone_numbers': nap.get('phone_numbers_found'),
+            'has_address': nap.get('has_address_indicators'),
+            'has_local_schema': nap.get('has_local_business_schema'),
+        })
+
+    # Thin content
+    word_count = data.get('word_count', 0) or 0
+    if word_count < 300 and word_count > 0:
+        issues['thin_content'].append({
+            'url': url,
+            'word_count': word_count,
+            'text_len': data.get('text_len', 0)
+        })
 
 
 def calculate_overall_score(summary: Dict[str, Any]) -> Tuple[int, str]:
@@ -359,7 +383,8 @@ def calculate_overall_score(summary: Dict[str, Any]) -> Tuple[int, str]:
     return score_int, grade
 
 
-def calculate_summary(all_pages: Dict[str, Any], issues: Dict[str, Any], duplicates: Dict) -> Dict[str, Any]:
+def calculate_summary(all_pages: Dict[str, Any], issues: Dict[str, Any], duplicates: Dict,
+                      start_url: Optional[str] = None) -> Dict[str, Any]:
     """
     Oblicza podsumowanie statystyk audytu.
     Pomija strony wykluczone i noindex.
@@ -368,69 +393,103 @@ def calculate_summary(all_pages: Dict[str, Any], issues: Dict[str, Any], duplica
         all_pages: Słownik wszystkich przeanalizowanych stron
         issues: Słownik ze znalezionymi problemami
         duplicates: Słownik z duplikatami
+        start_url: URL startowy audytu (domyślnie START_URL z konfiguracji)
 
     Returns:
         Słownik z podsumowaniem audytu
     """
-    from compass.config import START_URL
+    stats = _new_page_stats()
+    for data in all_pages.values():
+        _collect_page_stats(stats, data)
+    return _summary_from_stats(stats, issues, duplicates, start_url)
+
+
+def _new_page_stats() -> Dict[str, float]:
+    """Tworzy liczniki statystyk stron używane przez podsumowanie."""
+    keys = (
+        "crawled", "analyzed", "content", "system", "excluded", "noindex", "ok",
+        "mobile_friendly", "with_schema", "schema_sum", "eeat_sum", "local_optimized",
+        "security_sum", "with_ssl", "bytes_received", "truncated",
+    )
+    return dict.fromkeys(keys, 0)
 
-    # Filtrujemy strony: wykluczamy is_excluded oraz noindex
-    analyzed_pages = {
-        url: data for url, data in all_pages.items()
-        if not data.get('is_excluded') and not is_noindex_page(data)
-    }
-    excluded_count = len([p for p in all_pages.values() if p.get('is_excluded')])
-    noindex_count = len([p for p in all_pages.values() if is_noindex_page(p)])
-    system_pages_count = len([p for p in all_pages.values() if is_system_page_data(p)])
-
-    # Strony treściowe (nie systemowe, nie wykluczone, nie noindex)
-    content_pages = {
-        url: data for url, data in analyzed_pages.items()
-        if not is_system_page_data(data)
-    }
 
-    pages_with_errors = len(issues['critical_errors'])
-    pages_ok = len([p for p in analyzed_pages.values() if p.get('status') == 200])
-
-    # Mobile-friendly - dla wszystkich stron
-    mobile_friendly = sum(1 for p in analyzed_pages.values() if p.get('is_mobile_friendly'))
-    mobile_percentage = round(mobile_friendly / max(1, len(analyzed_pages)) * 100, 1)
-
-    # Schema.org - tylko dla stron treściowych
-    pages_with_schema = sum(1 for p in content_pages.values() if p.get('schema_count', 0) > 0)
-    avg_schema_types = sum(p.get('schema_count', 0) for p in content_pages.values()) / max(1, len(content_pages))
-
-    # E-E-A-T - tylko dla stron treściowych
-    avg_eeat = sum(
-        p.get('eeat_signals', {}).get('eeat_percentage', 0)
-        for p in content_pages.values()
-    ) / max(1, len(content_pages))
-
-    # Local SEO (NAP) - tylko dla stron treściowych
-    local_optimized = sum(
-        1 for p in content_pages.values()
-        if p.get('nap_signals', {}).get('nap_score', 0) >= 2
-    )
+def _collect_page_stats(stats: Dict[str, float], data: Dict[str, Any]):
+    """
+    Dolicza pojedynczą stronę do statystyk podsumowania.
 
-    # Bezpieczeństwo - dla wszystkich stron
-    avg_security = sum(
-        p.get('security', {}).get('security_percentage', 0)
-        for p in analyzed_pages.values()
-    ) / max(1, len(analyzed_pages))
+    Args:
+        stats: Liczniki (z `_new_page_stats()`)
+        data: Dane strony
+    """
+    stats["crawled"] += 1
+    stats["bytes_received"] += data.get('bytes_received', 0) or 0
+    stats["truncated"] += bool(data.get('truncated'))
+    excluded = data.get('is_excluded')
+    noindex = is_noindex_page(data)
+    system = is_system_page_data(data)
+    stats["excluded"] += bool(excluded)
+    stats["noindex"] += noindex
+    stats["system"] += bool(system)
 
-    pages_with_ssl = sum(1 for p in analyzed_pages.values() if p.get('security', {}).get('has_ssl'))
-    ssl_percentage = round(pages_with_ssl / max(1, len(analyzed_pages)) * 100, 1)
+    # Filtrujemy strony: wykluczamy is_excluded oraz noindex
+    if excluded or noindex:
+        return
+    stats["analyzed"] += 1
+    if data.get('status') == 200:
+        stats["ok"] += 1
+
+    # Mobile-friendly i bezpieczeństwo - dla wszystkich stron
+    if data.get('is_mobile_friendly'):
+        stats["mobile_friendly"] += 1
+    security = data.get('security', {})
+    stats["security_sum"] += security.get('security_percentage', 0)
+    if security.get('has_ssl'):
+        stats["with_ssl"] += 1
+
+    # Schema.org, E-E-A-T i Local SEO - tylko dla stron treściowych (nie systemowych)
+    if system:
+        return
+    stats["content"] += 1
+    schema_count = data.get('schema_count', 0)
+    if schema_count > 0:
+        stats["with_schema"] += 1
+    stats["schema_sum"] += schema_count
+    stats["eeat_sum"] += data.get('eeat_signals', {}).get('eeat_percentage', 0)
+    if data.get('nap_signals', {}).get('nap_score', 0) >= 2:
+        stats["local_optimized"] += 1
+
+
+def _summary_from_stats(stats: Dict[str, float], issues: Dict[str, Any], duplicates: Dict,
+                        start_url: Optional[str] = None) -> Dict[str, Any]:
+    """Buduje podsumowanie audytu z liczników stron, problemów i duplikatów."""
+    from compass.config import START_URL
+
+    analyzed = stats["analyzed"]
+    content = stats["content"]
+    pages_with_errors = len(issues['critical_errors'])
+    mobile_friendly = stats["mobile_friendly"]
+    mobile_percentage = round(mobile_friendly / max(1, analyzed) * 100, 1)
+    pages_with_schema = stats["with_schema"]
+    avg_schema_types = stats["schema_sum"] / max(1, content)
+    avg_eeat = stats["eeat_sum"] / max(1, content)
+    local_optimized = stats["local_optimized"]
+    avg_security = stats["security_sum"] / max(1, analyzed)
+    pages_with_ssl = stats["with_ssl"]
+    ssl_percentage = round(pages_with_ssl / max(1, analyzed) * 100, 1)
 
     result = {
-        "start_url": START_URL,
-        "pages_crawled": len(all_pages),
-        "pages_analyzed": len(analyzed_pages),
-        "pages_content": len(content_pages),  # Strony treściowe
-        "pages_system": system_pages_count,  # Strony systemowe
-        "pages_excluded": excluded_count,
-        "pages_noindex": noindex_count,
-        "pages_ok": pages_ok,
+        "start_url": start_url or START_URL,
+        "pages_crawled": stats["crawled"],
+        "pages_analyzed": analyzed,
+        "pages_content": content,  # Strony treściowe
+        "pages_system": stats["system"],  # Strony systemowe
+        "pages_excluded": stats["excluded"],
+        "pages_noindex": stats["noindex"],
+        "pages_ok": stats["ok"],
         "pages_with_errors": pages_with_errors,
+        "pages_truncated": stats["truncated"],  # Strony obcięte do MAX_HTML_SIZE
+        "bytes_received": stats["bytes_received"],  # Pobrane bajty treści stron
         "missing_title": len(issues['missing_title']),
         "missing_description": len(issues['missing_description']),
         "title_issues": len(issues['title_issues']),
@@ -472,3 +531,27 @@ def calculate_summary(all_pages: Dict[str, Any], issues: Dict[str, Any], duplica
     result["overall_grade"] = overall_grade
 
     return result
+
+
+def analyze_pages(all_pages: Dict[str, Any], start_url: Optional[str] = None) -> Tuple[Dict, Dict, Dict]:
+    """
+    Wylicza duplikaty, problemy i podsumowanie w jednym przejściu po stronach.
+    Pozwala analizować wyniki czytane strumieniowo z pliku (np. `PageStream`)
+    bez wczytywania wszystkich stron do pamięci.
+
+    Args:
+        all_pages: Słownik lub strumień stron (obiekt z metodą `items()`)
+        start_url: URL startowy audytu (domyślnie START_URL z konfiguracji)
+
+    Returns:
+        Krotka: (duplikaty, problemy, podsumowanie)
+    """
+    maps = (defaultdict(list), defaultdict(list))
+    issues = _new_issues()
+    stats = _new_page_stats()
+    for url, data in all_pages.items():
+        _collect_duplicates(maps, url, data)
+        _collect_issues(issues, url, data)
+        _collect_page_stats(stats, data)
+    duplicates = _duplicates_from_maps(maps)
+    return duplicates, issues, _summary_from_stats(stats, issues, duplicates, start_url)
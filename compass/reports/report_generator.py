@@ -2,33 +2,107 @@
 Generator raportów w różnych formatach (JSON, CSV, Word)
 """
 import os
+import csv
 import json
-from typing import Dict, Any
-
-try:
-    import pandas as pd
-except Exception:
-    pd = None
+from typing import Dict, Any, TextIO
 
 from compass.config import USE_AI_SUMMARY, OPENAI_API_KEY
 from compass.integrations import generate_ai_summary
-from .analyzer import find_duplicates, analyze_issues, calculate_summary
+from .analyzer import analyze_pages
 from .word_report import create_word_report
 
+CSV_FIELDS = [
+    "url", "excluded", "status", "title", "title_length", "meta_description", "desc_length",
+    "canonical", "h1_count", "h2_count", "mobile_friendly", "has_og_image", "has_twitter_card",
+    "schema_types", "schema_count", "eeat_score", "nap_score", "word_count", "img_total",
+    "img_without_alt", "error", "has_ssl", "security_score", "security_level",
+    "security_headers_count", "has_hsts", "has_csp", "has_mixed_content", "bytes_received",
+    "truncated",
+]
+
+
+def _dump_value(f: TextIO, value: Any, level: int):
+    """Zapisuje wartość JSON tak jak json.dump(indent=2) na zadanym poziomie zagnieżdżenia."""
+    text = json.dumps(value, ensure_ascii=False, indent=2)
+    f.write(text.replace("\n", "\n" + "  " * level))
+
+
+def _write_json_report(path: str, summary: Dict, ai_summary: str, all_pages: Dict[str, Any],
+                       issues: Dict, duplicates: Dict, csv_writer=None):
+    """
+    Zapisuje raport JSON strona po stronie (format identyczny z json.dump(indent=2)),
+    opcjonalnie dopisując jednocześnie wiersze raportu CSV.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{\n  "summary": ')
+        _dump_value(f, summary, 1)
+        f.write(',\n  "ai_summary": ')
+        _dump_value(f, ai_summary, 1)
+        f.write(',\n  "pages": {')
+        first = True
+        for u, v in all_pages.items():
+            f.write("\n    " if first else ",\n    ")
+            first = False
+            f.write(json.dumps(u, ensure_ascii=False) + ": ")
+            _dump_value(f, v, 2)
+            if csv_writer is not None:
+                csv_writer.writerow(_csv_row(u, v))
+        f.write("}" if first else "\n  }")
+        f.write(',\n  "issues": ')
+        _dump_value(f, issues, 1)
+        f.write(',\n  "duplicates": ')
+        _dump_value(f, duplicates, 1)
+        f.write("\n}")
+
+
+def _csv_row(u: str, v: Dict[str, Any]) -> Dict[str, Any]:
+    """Buduje wiersz raportu CSV dla strony."""
+    return {
+        "url": u,
+        "excluded": v.get("is_excluded", False),
+        "status": v.get("status"),
+        "title": v.get("title"),
+        "title_length": v.get("meta_scores", {}).get("title_length"),
+        "meta_description": v.get("meta_description"),
+        "desc_length": v.get("meta_scores", {}).get("desc_length"),
+        "canonical": v.get("canonical"),
+        "h1_count": v.get("h1_count"),
+        "h2_count": v.get("h2_count"),
+        "mobile_friendly": v.get("is_mobile_friendly"),
+        "has_og_image": v.get("has_og_image"),
+        "has_twitter_card": v.get("has_twitter_card"),
+        "schema_types": ",".join(v.get("jsonld_types", [])),
+        "schema_count": v.get("schema_count"),
+        "eeat_score": v.get("eeat_signals", {}).get("eeat_percentage"),
+        "nap_score": v.get("nap_signals", {}).get("nap_score"),
+        "word_count": v.get("word_count"),
+        "img_total": v.get("img_total"),
+        "img_without_alt": v.get("img_without_alt"),
+        "error": v.get("error"),
+        "has_ssl": v.get("security", {}).get("has_ssl"),
+        "security_score": v.get("security", {}).get("security_percentage"),
+        "security_level": v.get("security", {}).get("security_level"),
+        "security_headers_count": v.get("security", {}).get("headers_count"),
+        "has_hsts": v.get("security", {}).get("security_checks", {}).get("hsts", {}).get("present"),
+        "has_csp": v.get("security", {}).get("security_checks", {}).get("content_security_policy", {}).get("present"),
+        "has_mixed_content": v.get("security", {}).get("has_mixed_content"),
+        "bytes_received": v.get("bytes_received"),
+        "truncated": v.get("truncated", False),
+    }
+
 
 def save_reports(all_pages: Dict[str, Any], start_url: str, output_dir: str):
     """
     Generuje i zapisuje wszystkie raporty (JSON, CSV, Word).
 
     Args:
-        all_pages: Słownik wszystkich przeanalizowanych stron
+        all_pages: Słownik wszystkich przeanalizowanych stron lub strumień
+            wyników czytany z pliku JSONL (`PageStream`)
         start_url: URL startowy audytu
         output_dir: Katalog wyjściowy dla raportów
     """
-    # Analiza duplikatów i problemów
-    duplicates = find_duplicates(all_pages)
-    issues = analyze_issues(all_pages)
-    summary = calculate_summary(all_pages, issues, duplicates)
+    # Analiza duplikatów i problemów (jedno przejście po stronach)
+    duplicates, issues, summary = analyze_pages(all_pages, start_url)
 
     # Generowanie AI Summary (jeśli włączone)
     ai_summary_text = ""
@@ -38,61 +112,17 @@ def save_reports(all_pages: Dict[str, Any], start_url: str, output_dir: str):
         if ai_summary_text:
             print("✅ AI Summary wygenerowane")
 
-    # Zapis raportu JSON
+    # Zapis raportów JSON i CSV - strony są zapisywane po kolei (drugie przejście),
+    # więc nie muszą mieścić się naraz w pamięci
     json_path = os.path.join(output_dir, "raport_szczegolowy.json")
-    payload = {
-        "summary": summary,
-        "ai_summary": ai_summary_text,
-        "pages": all_pages,
-        "issues": issues,
-        "duplicates": duplicates
-    }
-
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    csv_path = os.path.join(output_dir, "raport_tabela.csv")
+    with open(csv_path, "w", encoding="utf-8", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        _write_json_report(json_path, summary, ai_summary_text, all_pages, issues, duplicates, writer)
 
     print(f"✅ JSON zapisany: {json_path}")
-
-    # Zapis raportu CSV (jeśli pandas dostępne)
-    if pd is not None:
-        csv_path = os.path.join(output_dir, "raport_tabela.csv")
-        rows = []
-
-        for u, v in all_pages.items():
-            rows.append({
-                "url": u,
-                "excluded": v.get("is_excluded", False),
-                "status": v.get("status"),
-                "title": v.get("title"),
-                "title_length": v.get("meta_scores", {}).get("title_length"),
-                "meta_description": v.get("meta_description"),
-                "desc_length": v.get("meta_scores", {}).get("desc_length"),
-                "canonical": v.get("canonical"),
-                "h1_count": v.get("h1_count"),
-                "h2_count": v.get("h2_count"),
-                "mobile_friendly": v.get("is_mobile_friendly"),
-                "has_og_image": v.get("has_og_image"),
-                "has_twitter_card": v.get("has_twitter_card"),
-                "schema_types": ",".join(v.get("jsonld_types", [])),
-                "schema_count": v.get("schema_count"),
-                "eeat_score": v.get("eeat_signals", {}).get("eeat_percentage"),
-                "nap_score": v.get("nap_signals", {}).get("nap_score"),
-                "word_count": v.get("word_count"),
-                "img_total": v.get("img_total"),
-                "img_without_alt": v.get("img_without_alt"),
-                "error": v.get("error"),
-                "has_ssl": v.get("security", {}).get("has_ssl"),
-                "security_score": v.get("security", {}).get("security_percentage"),
-                "security_level": v.get("security", {}).get("security_level"),
-                "security_headers_count": v.get("security", {}).get("headers_count"),
-                "has_hsts": v.get("security", {}).get("security_checks", {}).get("hsts", {}).get("present"),
-                "has_csp": v.get("security", {}).get("security_checks", {}).get("content_security_policy", {}).get("present"),
-                "has_mixed_content": v.get("security", {}).get("has_mixed_content"),
-            })
-
-        df = pd.DataFrame(rows)
-        df.to_csv(csv_path, index=False, encoding="utf-8")
-        print(f"✅ CSV zapisany: {csv_path}")
+    print(f"✅ CSV zapisany: {csv_path}")
 
     # Zapis raportu Word
     word_path = os.path.join(output_dir, "raport_dla_klienta.docx")
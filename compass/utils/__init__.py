@@ -9,8 +9,16 @@ from .url_utils import (
     normalize_url_for_analysis,
     is_system_page,
     get_canonical_url,
+    url_template,
+    crawl_candidate,
+    registered_domain,
+    SiteScope,
+    site_scope,
 )
+from .url_rules import PatternSet, site_rules, excluded_rule, system_page_rule
 from .text_utils import clean_text
+from .http_session import create_session, page_timeout, stream_timeout
+from .encoding import sniff_encoding, decode_html
 
 __all__ = [
     'same_site',
@@ -20,5 +28,19 @@ __all__ = [
     'normalize_url_for_analysis',
     'is_system_page',
     'get_canonical_url',
+    'url_template',
+    'crawl_candidate',
+    'registered_domain',
+    'SiteScope',
+    'site_scope',
+    'PatternSet',
+    'site_rules',
+    'excluded_rule',
+    'system_page_rule',
     'clean_text',
+    'create_session',
+    'page_timeout',
+    'stream_timeout',
+    'sniff_encoding',
+    'decode_html',
 ]
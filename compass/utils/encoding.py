@@ -0,0 +1,97 @@
+"""
+Wykrywanie kodowania znaków stron HTML (nagłówek HTTP, BOM, <meta charset>)
+i jednokrotne dekodowanie treści
+"""
+import codecs
+import re
+from typing import Optional, Tuple, Union
+
+from compass.config import ENCODING_SNIFF_BYTES, FALLBACK_ENCODING
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# <meta charset="..."> oraz <meta http-equiv="Content-Type" content="text/html; charset=...">
+_META_CHARSET_RE = re.compile(
+    rb"""<meta[^>]+?charset\s*=\s*["']?\s*([a-zA-Z0-9_:.+-]+)""",
+    re.IGNORECASE,
+)
+_HEADER_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?\s*([a-zA-Z0-9_:.+-]+)""", re.IGNORECASE)
+
+# Etykiety, które przeglądarki (wg WHATWG) traktują jak windows-1252
+_LABEL_ALIASES = {
+    "iso8859-1": "cp1252",
+    "ascii": "cp1252",
+}
+
+
+def _normalize_label(label: Optional[str]) -> Optional[str]:
+    """Zamienia etykietę kodowania na nazwę kodeka Pythona (None gdy nieznana)."""
+    if not label:
+        return None
+    try:
+        name = codecs.lookup(label.strip().strip("\"'")).name
+    except LookupError:
+        return None
+    return _LABEL_ALIASES.get(name, name)
+
+
+def sniff_encoding(head: bytes, content_type: Optional[str] = None) -> Optional[str]:
+    """
+    Ustala kodowanie strony na podstawie BOM, nagłówka Content-Type
+    i deklaracji <meta charset> w pierwszych bajtach dokumentu.
+
+    Args:
+        head: Początek treści strony (wystarczy ENCODING_SNIFF_BYTES bajtów)
+        content_type: Wartość nagłówka Content-Type
+
+    Returns:
+        Nazwa kodeka lub None, jeśli kodowania nie zadeklarowano
+    """
+    for bom, name in _BOMS:
+        if head.startswith(bom):
+            return name
+
+    if content_type:
+        match = _HEADER_CHARSET_RE.search(content_type)
+        name = _normalize_label(match.group(1)) if match else None
+        if name:
+            return name
+
+    match = _META_CHARSET_RE.search(head[:ENCODING_SNIFF_BYTES])
+    if match:
+        name = _normalize_label(match.group(1).decode("ascii", "ignore"))
+        # Deklaracja UTF-16 w <meta> jest ignorowana przez przeglądarki (dokument czytelny jako ASCII nie jest UTF-16)
+        if name and not name.startswith("utf-16"):
+            return name
+    return None
+
+
+def decode_html(body: Union[bytes, str], encoding: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Dekoduje treść strony dokładnie raz.
+
+    Gdy kodowanie nie jest znane, treść jest dekodowana jako UTF-8, a jeśli
+    nie jest poprawnym UTF-8 - jako FALLBACK_ENCODING (typowe dla starszych
+    stron bez deklaracji kodowania).
+
+    Args:
+        body: Treść strony (bajty; tekst jest zwracany bez zmian)
+        encoding: Kodowanie ustalone przez `sniff_encoding` (opcjonalnie)
+
+    Returns:
+        Krotka: (tekst strony, użyte kodowanie)
+    """
+    if isinstance(body, str):
+        return body, encoding or "utf-8"
+    if encoding:
+        if encoding == "utf-8" and body.startswith(codecs.BOM_UTF8):
+            encoding = "utf-8-sig"
+        return body.decode(encoding, errors="ignore"), encoding
+    try:
+        return body.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        return body.decode(FALLBACK_ENCODING, errors="ignore"), FALLBACK_ENCODING
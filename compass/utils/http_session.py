@@ -0,0 +1,79 @@
+"""
+Fabryka sesji HTTP - wspólna konfiguracja puli połączeń, DNS, keep-alive,
+kompresji i limitów czasu
+"""
+from typing import Optional
+
+import aiohttp
+
+try:
+    # aiohttp dekoduje brotli tylko z zainstalowanym pakietem brotli/brotlicffi
+    from aiohttp.compression_utils import HAS_BROTLI
+except ImportError:
+    HAS_BROTLI = False
+
+from compass.config import (
+    USER_AGENT,
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    TOTAL_TIMEOUT,
+    CONNECTION_LIMIT,
+    CONNECTION_LIMIT_PER_HOST,
+    DNS_CACHE_TTL,
+    KEEPALIVE_TIMEOUT,
+    HTTP_COMPRESSION,
+)
+
+
+def accept_encoding() -> str:
+    """Zwraca wartość nagłówka Accept-Encoding (br tylko gdy aiohttp potrafi go zdekodować)."""
+    if not HTTP_COMPRESSION:
+        return "identity"
+    return "br, gzip, deflate" if HAS_BROTLI else "gzip, deflate"
+
+
+def page_timeout() -> aiohttp.ClientTimeout:
+    """Limity czasu dla pobierania stron (połączenie, odczyt, całe zapytanie)."""
+    return aiohttp.ClientTimeout(total=TOTAL_TIMEOUT, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+
+
+def stream_timeout() -> aiohttp.ClientTimeout:
+    """
+    Limity czasu dla długich odpowiedzi czytanych strumieniowo (np. sitemap):
+    bez limitu całkowitego, ale z limitem przerwy w odbieraniu danych.
+    """
+    return aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+
+
+def create_session(
+    limit: Optional[int] = None,
+    limit_per_host: Optional[int] = None,
+) -> aiohttp.ClientSession:
+    """
+    Tworzy sesję aiohttp ze wspólną, dostrojoną pulą połączeń.
+
+    Połączenia są utrzymywane (keep-alive) i ponownie używane między
+    zapytaniami, a wyniki DNS są cache'owane, więc kolejne strony tego samego
+    hosta nie płacą za ponowne rozwiązywanie nazwy ani handshake TLS.
+
+    Args:
+        limit: Łączny limit połączeń (domyślnie CONNECTION_LIMIT, 0 = bez limitu)
+        limit_per_host: Limit połączeń do jednego hosta
+            (domyślnie CONNECTION_LIMIT_PER_HOST, 0 = bez limitu)
+
+    Returns:
+        Sesja aiohttp (należy ją zamknąć, np. przez `async with`)
+    """
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT if limit is None else limit,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST if limit_per_host is None else limit_per_host,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        use_dns_cache=True,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=page_timeout(),
+        headers={"User-Agent": USER_AGENT, "Accept-Encoding": accept_encoding()},
+        auto_decompress=True,
+    )
@@ -0,0 +1,264 @@
+"""
+Reguły klasyfikacji URL-i (wykluczenia, strony systemowe) - listy wzorców
+kompilowane raz do jednego wyrażenia, z możliwością nadpisania per witryna
+"""
+import json
+import os
+import re
+import urllib.parse
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from compass.config import EXCLUDED_PATTERNS, SYSTEM_PAGE_PATTERNS, SITE_PATTERNS_DIR, URL_CACHE_SIZE
+
+_BACKREF_RE = re.compile(r"\\[1-9]|\(\?P=")
+_SPECIAL = set(".^$*+?{}[]\\|()")
+_QUANTIFIERS = set("*+?{")
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """Sprawdza, czy wzorzec zawiera `|` poza nawiasami i klasami znaków."""
+    depth, in_class, escaped = 0, False, False
+    for ch in pattern:
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return True
+    return False
+
+
+def _literal_prefix(pattern: str) -> Tuple[str, str]:
+    """
+    Dzieli wzorzec na stały prefiks i resztę (np. '/feed/?$' -> '/feed', '/?$').
+
+    Wzorce z alternatywą `|` lub zaczynające się od znaku specjalnego
+    (np. `^`) nie mają prefiksu.
+    """
+    if _has_top_level_alternation(pattern):
+        return "", pattern
+    literal, i, last = [], 0, 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            char, step = pattern[i + 1], 2
+        elif ch in _SPECIAL:
+            break
+        else:
+            char, step = ch, 1
+        # Znak z kwantyfikatorem (a?, a*) nie należy już do stałego prefiksu
+        if i + step < len(pattern) and pattern[i + step] in _QUANTIFIERS:
+            break
+        literal.append(char)
+        i += step
+        last = i
+    return "".join(literal), pattern[last:]
+
+
+def _trie_regex(node: Dict) -> str:
+    """Zamienia drzewo prefiksów na wyrażenie ze wspólnymi prefiksami wyciągniętymi przed nawias."""
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in node.items() if ch != ""]
+    branches += [f"(?:{suffix})" if suffix else "" for _, suffix in node.get("", [])]
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
+
+
+class PatternSet:
+    """
+    Lista wzorców skompilowana do jednego wyrażenia.
+
+    Stałe prefiksy wzorców (np. '/konto', '/koszyk') są układane w drzewo,
+    więc wyrażenie ma postać '/(?:ko(?:nto...|szyk)|...)' i koszt sprawdzenia
+    URL-a praktycznie nie rośnie z liczbą wzorców. Dopiero po dopasowaniu
+    ustalana jest reguła - spośród wzorców, których prefiks pasuje w miejscu
+    dopasowania. Wzorce z odwołaniami wstecznymi są sprawdzane osobno.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        """
+        Args:
+            patterns: Lista wyrażeń regularnych (jak EXCLUDED_PATTERNS)
+        """
+        self.patterns: List[str] = []
+        self._compiled: List[re.Pattern] = []
+        self._separate: List[int] = []
+        self._unprefixed: List[int] = []
+        self._trie: Dict = {}
+        self._regex: Optional[re.Pattern] = None
+
+        for pattern in dict.fromkeys(patterns):
+            try:
+                regex = re.compile(pattern)
+            except re.error as e:
+                print(f"⚠️  Pominięto błędny wzorzec {pattern!r}: {e}")
+                continue
+            index = len(self.patterns)
+            self.patterns.append(pattern)
+            self._compiled.append(regex)
+            # Odwołania wsteczne (\1) zmieniłyby znaczenie po połączeniu wzorców
+            if _BACKREF_RE.search(pattern):
+                self._separate.append(index)
+                continue
+            prefix, suffix = _literal_prefix(pattern)
+            if not prefix:
+                self._unprefixed.append(index)
+            node = self._trie
+            for ch in prefix:
+                node = node.setdefault(ch, {})
+            node.setdefault("", []).append((index, suffix))
+
+        if self._trie:
+            try:
+                self._regex = re.compile(_trie_regex(self._trie))
+            except re.error:
+                # Np. flagi inline, które są dozwolone tylko na początku wyrażenia
+                self._regex = None
+                self._separate = list(range(len(self.patterns)))
+
+    def _candidates(self, text: str, pos: int) -> List[int]:
+        """Indeksy wzorców, których stały prefiks występuje w tekście od pozycji pos."""
+        found = list(self._unprefixed)
+        node = self._trie
+        for ch in text[pos:]:
+            node = node.get(ch)
+            if node is None:
+                break
+            found.extend(index for index, _ in node.get("", ()))
+        return sorted(found)
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        Sprawdza tekst wszystkimi wzorcami.
+
+        Args:
+            text: Tekst do sprawdzenia (np. ścieżka URL-a)
+
+        Returns:
+            Dopasowany wzorzec (reguła) lub None
+        """
+        if self._regex is not None:
+            m = self._regex.search(text)
+            if m:
+                for index in self._candidates(text, m.start()):
+                    if self._compiled[index].match(text, m.start()):
+                        return self.patterns[index]
+                # Zabezpieczenie - nie powinno się zdarzyć
+                for index, regex in enumerate(self._compiled):
+                    if regex.search(text):
+                        return self.patterns[index]
+        for index in self._separate:
+            if self._compiled[index].search(text):
+                return self.patterns[index]
+        return None
+
+
+class SiteRules:
+    """Reguły wykluczeń i stron systemowych obowiązujące dla jednej witryny."""
+
+    def __init__(self, excluded: Sequence[str], system: Sequence[str]):
+        """
+        Args:
+            excluded: Wzorce stron wykluczonych z analizy
+            system: Wzorce stron systemowych
+        """
+        self.excluded = PatternSet(excluded)
+        self.system = PatternSet(system)
+
+
+def _site_key(netloc: str) -> str:
+    """Host bez portu i prefiksu www. (nazwa pliku z regułami witryny)."""
+    host = netloc.rsplit("@", 1)[-1].split(":", 1)[0].lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _load_site_file(path: str) -> Dict[str, List[str]]:
+    """Wczytuje plik reguł witryny; błędny plik jest zgłaszany i pomijany."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("oczekiwano obiektu JSON")
+        return data
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Pominięto reguły witryny {path}: {e}")
+        return {}
+
+
+@lru_cache(maxsize=256)
+def site_rules(netloc: str) -> SiteRules:
+    """
+    Zwraca reguły dla witryny.
+
+    Domyślnie są to EXCLUDED_PATTERNS i SYSTEM_PAGE_PATTERNS z konfiguracji.
+    Jeśli w katalogu SITE_PATTERNS_DIR istnieje plik `<host>.json`
+    (host bez www.), jego wzorce są dopisywane do domyślnych, np.:
+
+        {"excluded": ["/aktualnosci/archiwum"], "system": ["/panel"]}
+
+    Z kluczem `"replace": true` zastępują domyślne listy.
+
+    Args:
+        netloc: Host witryny (może zawierać port i www.)
+
+    Returns:
+        Obiekt SiteRules
+    """
+    excluded, system = list(EXCLUDED_PATTERNS), list(SYSTEM_PAGE_PATTERNS)
+    key = _site_key(netloc)
+    path = os.path.join(SITE_PATTERNS_DIR, f"{key}.json") if key else ""
+    if path and os.path.isfile(path):
+        data = _load_site_file(path)
+        if data.get("replace"):
+            excluded, system = [], []
+        excluded += [str(p) for p in data.get("excluded", [])]
+        system += [str(p) for p in data.get("system", [])]
+    return SiteRules(excluded, system)
+
+
+def excluded_rule_for(netloc: str, path: str) -> Optional[str]:
+    """Reguła wykluczenia dla już sparsowanego URL-a (host i ścieżka)."""
+    return site_rules(netloc).excluded.match(path.lower())
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def excluded_rule(url: str) -> Optional[str]:
+    """
+    Zwraca regułę wykluczenia, do której pasuje ścieżka URL-a.
+    Wyniki są zapamiętywane (LRU).
+
+    Args:
+        url: URL do sprawdzenia
+
+    Returns:
+        Dopasowany wzorzec lub None
+    """
+    parsed = urllib.parse.urlsplit(url)
+    return excluded_rule_for(parsed.netloc, parsed.path)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def system_page_rule(url: str) -> Optional[str]:
+    """
+    Zwraca regułę strony systemowej pasującą do ścieżki lub pełnego URL-a.
+    Wyniki są zapamiętywane (LRU).
+
+    Args:
+        url: URL do sprawdzenia
+
+    Returns:
+        Dopasowany wzorzec lub None
+    """
+    parsed = urllib.parse.urlsplit(url)
+    rules = site_rules(parsed.netloc).system
+    # Ścieżkę sprawdzamy osobno, bo wzorce zakotwiczone ($) nie pasują do URL-a z parametrami
+    return rules.match(parsed.path.lower()) or rules.match(url.lower())
@@ -3,9 +3,111 @@ Narzędzia do przetwarzania URL-i
 """
 import re
 import urllib.parse
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 import tldextract
 from url_normalize import url_normalize
-from compass.config import DOMAIN_SCOPE, EXCLUDED_PATTERNS, SYSTEM_PAGE_PATTERNS
+from compass.config import DOMAIN_SCOPE, URL_CACHE_SIZE
+from .url_rules import excluded_rule, excluded_rule_for, system_page_rule
+
+_PAGINATION_RE = re.compile(r'/page/\d+/?$')
+_ABSOLUTE_URL_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*://')
+_ORIGIN_RE = re.compile(r'^([a-zA-Z][a-zA-Z0-9+.-]*)://([^/?#]*)')
+
+
+# Ekstraktor korzysta wyłącznie z listy sufiksów publicznych dołączonej do pakietu
+# tldextract - bez pobierania listy z sieci i bez zapisu cache na dysku
+_TLD_EXTRACT = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def registered_domain(host: str) -> str:
+    """
+    Zwraca domenę zarejestrowaną hosta (np. blog.example.co.uk -> example.co.uk).
+    Wyniki są zapamiętywane (LRU).
+
+    Args:
+        host: Host lub netloc URL-a (port jest ignorowany)
+
+    Returns:
+        Domena zarejestrowana lub sam host bez portu (np. dla adresu IP lub localhost)
+    """
+    ext = _TLD_EXTRACT(host)
+    if ext.domain and ext.suffix:
+        return f"{ext.domain}.{ext.suffix}"
+    return urllib.parse.urlsplit(f"//{host}").hostname or ""
+
+
+class SiteScope:
+    """
+    Zakres witryny wyznaczony raz na podstawie URL-a startowego.
+
+    Odpowiedzi są cache'owane per (scheme, host), więc sprawdzenie kolejnego
+    linku do znanego hosta to jedno `urlsplit` i jedno wyszukanie w słowniku.
+    """
+
+    def __init__(self, start_url: str, mode: str = DOMAIN_SCOPE):
+        """
+        Args:
+            start_url: URL startowy audytu
+            mode: "root" (ten sam scheme i host) lub "sub" (cała domena z subdomenami)
+        """
+        parts = urllib.parse.urlsplit(start_url)
+        self.mode = mode
+        self.origin = (parts.scheme, parts.netloc)
+        self.domain = registered_domain(parts.netloc) if mode == "sub" else ""
+        self._hosts: Dict[Tuple[str, str], bool] = {}
+
+    def contains(self, url: str) -> bool:
+        """
+        Sprawdza, czy URL należy do witryny.
+
+        Args:
+            url: Absolutny URL
+
+        Returns:
+            True jeśli URL należy do witryny
+        """
+        # Szybka ścieżka dla typowych URL-i http(s) - bez pełnego urlsplit
+        match = _ORIGIN_RE.match(url)
+        if match:
+            return self.contains_host(match.group(1).lower(), match.group(2))
+        scheme, netloc = urllib.parse.urlsplit(url)[:2]
+        return self.contains_host(scheme, netloc)
+
+    def contains_host(self, scheme: str, netloc: str) -> bool:
+        """Logika `contains` dla już wyodrębnionych scheme i hosta."""
+        key = (scheme, netloc)
+        result = self._hosts.get(key)
+        if result is None:
+            if self.mode == "sub":
+                result = scheme in ("http", "https") and registered_domain(netloc) == self.domain
+            else:
+                result = key == self.origin
+            if len(self._hosts) >= URL_CACHE_SIZE:
+                self._hosts.clear()
+            self._hosts[key] = result
+        return result
+
+
+@lru_cache(maxsize=64)
+def site_scope(url: str) -> SiteScope:
+    """
+    Zwraca (współdzielony) zakres witryny, do której należy URL.
+
+    Args:
+        url: URL startowy lub dowolny URL witryny
+
+    Returns:
+        Obiekt SiteScope
+    """
+    scheme, netloc = urllib.parse.urlsplit(url)[:2]
+    return _site_scope_for_origin(scheme, netloc)
+
+
+@lru_cache(maxsize=64)
+def _site_scope_for_origin(scheme: str, netloc: str) -> SiteScope:
+    return SiteScope(f"{scheme}://{netloc}/")
 
 
 def same_site(u1: str, u2: str) -> bool:
@@ -19,15 +121,7 @@ def same_site(u1: str, u2: str) -> bool:
     Returns:
         True jeśli URL-e należą do tej samej witryny
     """
-    a = urllib.parse.urlparse(u1)
-    b = urllib.parse.urlparse(u2)
-
-    if DOMAIN_SCOPE == "sub":
-        ea = tldextract.extract(a.netloc)
-        eb = tldextract.extract(b.netloc)
-        return (a.scheme in ("http", "https")) and (ea.registered_domain == eb.registered_domain)
-    else:
-        return (a.scheme, a.netloc) == (b.scheme, b.netloc)
+    return site_scope(u1).contains(u2)
 
 
 def absolutize(base: str, link: str) -> str:
@@ -41,6 +135,19 @@ def absolutize(base: str, link: str) -> str:
     Returns:
         Znormalizowany absolutny URL
     """
+    # Wynik dla linku absolutnego nie zależy od bazy, a dla linku od korzenia (/x)
+    # zależy tylko od scheme + host - dzięki temu linki z nawigacji i stopki
+    # powtarzające się na każdej stronie trafiają w cache
+    if link.startswith("/") and not link.startswith("//"):
+        scheme, netloc = urllib.parse.urlsplit(base)[:2]
+        base = f"{scheme}://{netloc}/"
+    elif _ABSOLUTE_URL_RE.match(link):
+        base = ""
+    return _absolutize_cached(base, link)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _absolutize_cached(base: str, link: str) -> str:
     return url_normalize(urllib.parse.urljoin(base, link))
 
 
@@ -76,8 +183,11 @@ def should_skip_url(url: str) -> bool:
     Returns:
         True jeśli URL powinien być pominięty
     """
-    parsed = urllib.parse.urlparse(url)
+    return _should_skip_parts(urllib.parse.urlparse(url))
+
 
+def _should_skip_parts(parsed: urllib.parse.ParseResult) -> bool:
+    """Logika `should_skip_url` dla już sparsowanego URL-a."""
     # Pomijamy linki z fragmentami (anchor links)
     if parsed.fragment:
         return True
@@ -87,7 +197,7 @@ def should_skip_url(url: str) -> bool:
         return True
 
     # Pomijamy strony paginacji
-    if re.search(r'/page/\d+/?$', parsed.path):
+    if _PAGINATION_RE.search(parsed.path):
         return True
 
     return False
@@ -103,14 +213,31 @@ def is_excluded_url(url: str) -> bool:
     Returns:
         True jeśli URL powinien być wykluczony
     """
-    parsed = urllib.parse.urlparse(url)
-    path = parsed.path.lower()
+    return excluded_rule(url) is not None
 
-    for pattern in EXCLUDED_PATTERNS:
-        if re.search(pattern, path):
-            return True
 
-    return False
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def crawl_candidate(start_url: str, link: str) -> Optional[str]:
+    """
+    Decyduje w jednym przejściu (jedno parsowanie URL-a), czy link trafia do
+    kolejki crawlera: musi należeć do witryny, nie być wykluczony ani pominięty
+    (fragment, parametry, paginacja). Wyniki są zapamiętywane (LRU).
+
+    Args:
+        start_url: URL startowy audytu (wyznacza witrynę)
+        link: Absolutny URL znaleziony na stronie lub w sitemap
+
+    Returns:
+        URL znormalizowany do analizy lub None, jeśli link należy pominąć
+    """
+    parsed = urllib.parse.urlparse(link)
+    if not site_scope(start_url).contains_host(parsed.scheme, parsed.netloc):
+        return None
+    if excluded_rule_for(parsed.netloc, parsed.path) is not None:
+        return None
+    if _should_skip_parts(parsed):
+        return None
+    return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
 
 
 def is_system_page(url: str) -> bool:
@@ -124,15 +251,32 @@ def is_system_page(url: str) -> bool:
     Returns:
         True jeśli URL jest stroną systemową
     """
-    parsed = urllib.parse.urlparse(url)
-    path = parsed.path.lower()
-    full_url = url.lower()
+    return system_page_rule(url) is not None
 
-    for pattern in SYSTEM_PAGE_PATTERNS:
-        if re.search(pattern, path) or re.search(pattern, full_url):
-            return True
 
-    return False
+def url_template(url: str) -> str:
+    """
+    Zwraca szablon URL-a - typ strony wyznaczony przez strukturę ścieżki.
+    Pierwszy segment ścieżki (sekcja) zostaje, segmenty liczbowe są zamieniane
+    na {n}, a pozostałe na *, np. /blog/2024/moj-wpis/ -> example.com/blog/{n}/*.
+
+    Args:
+        url: URL strony
+
+    Returns:
+        Szablon URL-a
+    """
+    parsed = urllib.parse.urlsplit(url)
+    segments = [s for s in parsed.path.split("/") if s]
+    parts = []
+    for i, segment in enumerate(segments):
+        if segment.isdigit():
+            parts.append("{n}")
+        elif i == 0:
+            parts.append(segment.lower())
+        else:
+            parts.append("*")
+    return f"{parsed.netloc.lower()}/" + "/".join(parts)
 
 
 def get_canonical_url(url: str) -> str:
@@ -4,7 +4,10 @@ Compass - Audytor SEO/AEO/GEO Enhanced Edition
 
 Główny plik uruchomieniowy audytora.
 """
+import argparse
 import asyncio
+import os
+import sys
 import time
 
 from compass.config import (
@@ -16,19 +19,28 @@ from compass.config import (
     USE_AI_SUMMARY,
     OPENAI_API_KEY,
     OPENAI_MODEL,
+    PERSIST_STATE,
+    HTTP_CACHE,
+    INCREMENTAL,
+    STREAM_RESULTS,
+    RESULTS_FILE,
+    RESULTS_COMPRESS,
     get_output_dir,
 )
-from compass.crawler import crawl
+from compass.crawler import crawl, CrawlState, HttpCache, ResultSink
 from compass.reports import save_reports
+from compass.batch import load_sites, run_batch
 
 
-def print_header(output_dir: str):
+def print_header(output_dir: str, start_url: str, run_id: str = None):
     """Wyświetla nagłówek z informacjami o audycie."""
     print("=" * 80)
     print("🚀 AUDYTOR SEO/AEO/GEO - ENHANCED EDITION".center(80))
     print("=" * 80)
     print(f"\n📁 Katalog wyników: {output_dir}")
-    print(f"🌐 Audytowana strona: {START_URL}")
+    print(f"🌐 Audytowana strona: {start_url}")
+    if run_id:
+        print(f"🔖 ID audytu: {run_id} (wznowienie: python main.py --resume {run_id})")
     print(f"⚙️  MAX_PAGES={MAX_PAGES}, MAX_DEPTH={MAX_DEPTH}, CONCURRENCY={CONCURRENCY}")
     print(f"🚫 Wykluczono m.in. /cdn-cgi/*")
 
@@ -59,25 +71,126 @@ def print_footer(output_dir: str, elapsed_time: float):
     print("   • raport_dla_klienta.docx")
     print("   • raport_szczegolowy.json")
     print("   • raport_tabela.csv")
+    if STREAM_RESULTS:
+        print(f"   • {RESULTS_FILE}{'.gz' if RESULTS_COMPRESS else ''}")
     print("\n✅ Gotowe!")
 
 
+def parse_args() -> argparse.Namespace:
+    """Parsuje argumenty linii poleceń."""
+    parser = argparse.ArgumentParser(description="Compass - Audytor SEO/AEO/GEO")
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="wznawia przerwany audyt o podanym ID (zapisany stan crawlingu)",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="PLIK",
+        help="audyt wsadowy wielu witryn z pliku (jeden URL w linii) w jednym procesie",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="audyt przyrostowy: strony bez zmian (HTTP 304) są brane z cache poprzedniego audytu",
+    )
+    return parser.parse_args()
+
+
+def main_batch(sites_path: str, incremental: bool):
+    """Uruchamia audyt wsadowy wielu witryn."""
+    sites = load_sites(sites_path)
+    if not sites:
+        print(f"❌ Brak witryn w pliku: {sites_path}")
+        sys.exit(1)
+
+    cache = HttpCache(conditional=incremental) if HTTP_CACHE else None
+    print("=" * 80)
+    print("🚀 AUDYTOR SEO/AEO/GEO - TRYB WSADOWY".center(80))
+    print("=" * 80)
+    print()
+
+    t0 = time.time()
+    try:
+        results = asyncio.run(run_batch(sites, cache))
+    finally:
+        if cache:
+            cache.close()
+
+    failed = [url for url, output_dir in results.items() if output_dir is None]
+    print("\n" + "=" * 80)
+    print("📊 AUDYT WSADOWY ZAKOŃCZONY".center(80))
+    print("=" * 80)
+    print(f"\n⏱️  Czas wykonania: {time.time() - t0:.1f}s")
+    print(f"✅ Witryn: {len(results) - len(failed)}/{len(results)}")
+    for url in failed:
+        print(f"   ❌ {url}")
+    if failed:
+        sys.exit(1)
+
+
 def main():
     """Główna funkcja uruchamiająca audyt."""
-    # Utworzenie katalogu wyjściowego
-    output_dir = get_output_dir()
+    args = parse_args()
+    if args.batch:
+        main_batch(args.batch, INCREMENTAL or args.incremental)
+        return
+
+    state = None
+    start_url = START_URL
+
+    if args.resume:
+        # Wznowienie przerwanego audytu - URL i katalog wyjściowy z zapisanego stanu
+        try:
+            state = CrawlState.open(args.resume)
+        except KeyError:
+            print(f"❌ Nie znaleziono audytu o ID: {args.resume}")
+            sys.exit(1)
+        start_url = state.meta["start_url"]
+        output_dir = state.meta["output_dir"]
+        os.makedirs(output_dir, exist_ok=True)
+    else:
+        # Utworzenie katalogu wyjściowego
+        output_dir = get_output_dir()
+        if PERSIST_STATE:
+            state = CrawlState.create(os.path.basename(output_dir), start_url, output_dir)
+
+    # Cache HTTP (zapytania warunkowe tylko w trybie przyrostowym)
+    incremental = INCREMENTAL or args.incremental
+    cache = HttpCache(conditional=incremental) if HTTP_CACHE else None
+
+    # Wyniki stron zapisywane na bieżąco do pliku JSONL (przy wznowieniu - od nowa, ze stanu)
+    sink = ResultSink(os.path.join(output_dir, RESULTS_FILE)) if STREAM_RESULTS else None
 
     # Wyświetlenie nagłówka
-    print_header(output_dir)
+    print_header(output_dir, start_url, state.run_id if state else None)
+    if cache and incremental:
+        print("♻️  Tryb przyrostowy: strony bez zmian zostaną wzięte z cache\n")
 
     # Start pomiaru czasu
     t0 = time.time()
 
     # Uruchomienie crawlera
-    data = asyncio.run(crawl(START_URL))
+    try:
+        data = asyncio.run(crawl(start_url, state, cache, sink))
+    except BaseException:
+        if sink:
+            sink.close()
+        if state:
+            state.close()
+            print(f"\n⏸️  Audyt przerwany. Wznowienie: python main.py --resume {state.run_id}")
+        raise
+    finally:
+        if cache:
+            if cache.hits:
+                print(f"♻️  Strony bez zmian (z cache): {cache.hits}")
+            cache.close()
 
     # Generowanie raportów
-    save_reports(data, START_URL, output_dir)
+    save_reports(data, start_url, output_dir)
+    if state:
+        state.finish()
+        state.close()
 
     # Obliczenie czasu wykonania
     elapsed_time = time.time() - t0